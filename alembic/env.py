@@ -9,7 +9,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Import Base and models
 from app.core.database import Base  # Import Base correctly
-from app.models import lead, user  # Ensure models are loaded
+from app.models import lead, lead_deletion, lead_outbox, lead_stats, user  # Ensure models are loaded
 
 # Alembic Config object
 config = context.config
@@ -21,6 +21,14 @@ if config.config_file_name is not None:
 # Use your model's metadata for autogenerate support
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Leave SQLite-only schema objects (e.g. the unique email index of leads) out of autogenerate.
+    """
+    return not (type_ == "index" and object.info.get("sqlite_only"))
+
+
 # Run migrations in 'offline' mode
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
@@ -30,6 +38,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -48,7 +57,7 @@ async def run_migrations_online() -> None:
 
 def do_run_migrations(connection):
     """Helper function to run migrations."""
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
     with context.begin_transaction():
         context.run_migrations()
 
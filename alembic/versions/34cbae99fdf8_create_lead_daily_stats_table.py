@@ -0,0 +1,43 @@
+"""Create lead daily stats table
+
+Revision ID: 34cbae99fdf8
+Revises: 340affe688ea
+Create Date: 2026-10-19 09:12:41.502113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '34cbae99fdf8'
+down_revision: Union[str, None] = '340affe688ea'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('lead_daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('stage', sa.String(), nullable=False),
+    sa.Column('engaged', sa.Boolean(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'stage', 'engaged')
+    )
+    # Backfill the summary from the existing leads; from here on it is kept up to date by the CRUD layer.
+    op.execute(
+        """
+        INSERT INTO lead_daily_stats (day, stage, engaged, count)
+        SELECT CAST(COALESCE(created_at, now()) AS date), COALESCE(stage, ''), COALESCE(engaged, false), count(*)
+        FROM leads
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('lead_daily_stats')
@@ -0,0 +1,138 @@
+"""Partition leads by created_at month and enforce email uniqueness via lead_emails
+
+Revision ID: 73357c7656eb
+Revises: a061ff4d1b48
+Create Date: 2026-10-19 15:12:40.513207
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '73357c7656eb'
+down_revision: Union[str, None] = 'a061ff4d1b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Partitions created ahead of the current month; app.core.partitions keeps this horizon
+MONTHS_AHEAD = 3
+
+LEAD_COLUMNS = "id, name, email, company, phone, stage, engaged, last_contacted, created_at, updated_at"
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_month_partitions(table: str, first: date, last: date) -> None:
+    month = first
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE leads_y{month.year}m{month.month:02d} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # The partition key is part of the primary key and cannot be NULL
+    op.execute("UPDATE leads SET created_at = COALESCE(updated_at, now()) WHERE created_at IS NULL")
+
+    op.execute("""
+        CREATE TABLE leads_partitioned (
+            id UUID NOT NULL,
+            name VARCHAR NOT NULL,
+            email VARCHAR NOT NULL,
+            company VARCHAR,
+            phone VARCHAR,
+            stage VARCHAR,
+            engaged BOOLEAN,
+            last_contacted TIMESTAMP WITHOUT TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now()
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    today = date.today().replace(day=1)
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM leads")).scalar()
+    first = min(oldest.date().replace(day=1), today) if oldest else today
+    _create_month_partitions("leads_partitioned", first, _add_months(today, MONTHS_AHEAD))
+    # Catches rows beyond the horizon until their month's partition is created
+    op.execute("CREATE TABLE leads_default PARTITION OF leads_partitioned DEFAULT")
+
+    op.execute(f"INSERT INTO leads_partitioned ({LEAD_COLUMNS}) SELECT {LEAD_COLUMNS} FROM leads")
+    op.drop_table('leads')
+    op.execute("ALTER TABLE leads_partitioned RENAME TO leads")
+
+    # Unique constraints on a partitioned table must include the partition key
+    op.execute("ALTER TABLE leads ADD CONSTRAINT leads_pkey PRIMARY KEY (id, created_at)")
+    op.create_index('ix_leads_email', 'leads', ['email'], unique=False)
+    op.create_index('ix_leads_created_at', 'leads', ['created_at'], unique=False)
+    op.create_index('ix_leads_updated_at_id', 'leads', ['updated_at', 'id'], unique=False)
+
+    # Emails are unique across partitions through this unpartitioned registry,
+    # kept in sync by a trigger; a duplicate fails with a unique violation as before
+    op.create_table('lead_emails',
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('lead_id', sa.UUID(), nullable=False),
+    sa.PrimaryKeyConstraint('email')
+    )
+    op.execute("INSERT INTO lead_emails (email, lead_id) SELECT email, id FROM leads")
+    op.execute("""
+        CREATE FUNCTION leads_email_registry() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM lead_emails WHERE email = OLD.email AND lead_id = OLD.id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO lead_emails (email, lead_id) VALUES (NEW.email, NEW.id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER leads_email_registry
+        AFTER INSERT OR DELETE OR UPDATE OF email ON leads
+        FOR EACH ROW EXECUTE FUNCTION leads_email_registry()
+    """)
+
+    # Detached partitions are moved here by app.core.partitions
+    op.execute("CREATE SCHEMA IF NOT EXISTS archive")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER leads_email_registry ON leads")
+    op.execute("DROP FUNCTION leads_email_registry()")
+    op.drop_table('lead_emails')
+
+    op.execute("ALTER TABLE leads RENAME TO leads_partitioned")
+    op.create_table('leads',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('company', sa.String(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=True),
+    sa.Column('stage', sa.String(), nullable=True),
+    sa.Column('engaged', sa.Boolean(), nullable=True),
+    sa.Column('last_contacted', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id', name='leads_unpartitioned_pkey'),
+    )
+    # Archived partitions are not brought back
+    op.execute(f"INSERT INTO leads ({LEAD_COLUMNS}) SELECT {LEAD_COLUMNS} FROM leads_partitioned")
+    op.execute("DROP TABLE leads_partitioned")
+    op.execute("ALTER TABLE leads RENAME CONSTRAINT leads_unpartitioned_pkey TO leads_pkey")
+    op.create_index('ix_leads_email', 'leads', ['email'], unique=True)
+    op.create_index('ix_leads_updated_at_id', 'leads', ['updated_at', 'id'], unique=False)
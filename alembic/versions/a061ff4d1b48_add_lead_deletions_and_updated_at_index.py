@@ -0,0 +1,39 @@
+"""Add lead deletions log and updated_at index
+
+Revision ID: a061ff4d1b48
+Revises: 34cbae99fdf8
+Create Date: 2026-10-19 11:03:17.884920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a061ff4d1b48'
+down_revision: Union[str, None] = '34cbae99fdf8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('lead_deletions',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('lead_id', sa.UUID(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_lead_deletions_deleted_at'), 'lead_deletions', ['deleted_at'], unique=False)
+    # Rows without updated_at would be invisible to the delta sync
+    op.execute("UPDATE leads SET updated_at = COALESCE(created_at, now()) WHERE updated_at IS NULL")
+    op.create_index('ix_leads_updated_at_id', 'leads', ['updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_leads_updated_at_id', table_name='leads')
+    op.drop_index(op.f('ix_lead_deletions_deleted_at'), table_name='lead_deletions')
+    op.drop_table('lead_deletions')
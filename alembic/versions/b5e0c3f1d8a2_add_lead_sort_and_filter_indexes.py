@@ -0,0 +1,44 @@
+"""Add lead sort and filter indexes
+
+Revision ID: b5e0c3f1d8a2
+Revises: 2da91e072910
+Create Date: 2026-10-19 17:41:09.512870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e0c3f1d8a2'
+down_revision: Union[str, None] = '2da91e072910'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Columns the `where` filter supports `prefix` (LIKE 'abc%') on. Under a non-C collation
+# the plain btree indexes cannot serve LIKE, so these get varchar_pattern_ops indexes too.
+PREFIX_COLUMNS = ('name', 'email', 'company', 'stage')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_leads_stage', 'leads', ['stage'], unique=False)
+    op.create_index('ix_leads_name', 'leads', ['name'], unique=False)
+    op.create_index('ix_leads_company', 'leads', ['company'], unique=False)
+    for column in PREFIX_COLUMNS:
+        op.create_index(
+            f'ix_leads_{column}_pattern', 'leads', [column], unique=False,
+            postgresql_ops={column: 'varchar_pattern_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(PREFIX_COLUMNS):
+        op.drop_index(f'ix_leads_{column}_pattern', table_name='leads')
+    op.drop_index('ix_leads_company', table_name='leads')
+    op.drop_index('ix_leads_name', table_name='leads')
+    op.drop_index('ix_leads_stage', table_name='leads')
@@ -0,0 +1,39 @@
+# app/api/routes/debug.py
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+from app.profiling import profile_store, verify_profile_token
+
+router = APIRouter()
+
+
+def require_profile_token(x_profile_token: Optional[str] = Header(None)):
+    """
+    Admin access to the profiles: the same signed X-Profile-Token that enables profiling.
+    """
+    if not verify_profile_token(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Valid X-Profile-Token required")
+
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+def list_profiles():
+    """
+    List the stored request profiles, most recent first.
+    """
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+def get_profile(profile_id: str, format: str = Query("summary", pattern="^(summary|collapsed|speedscope)$")):
+    """
+    Retrieve one profile: its summary (wall, DB and Python time), its stacks in collapsed
+    format (flamegraph.pl, speedscope) or as a speedscope JSON file.
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    if format == "speedscope":
+        return profile.speedscope()
+    return profile.summary()
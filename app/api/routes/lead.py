@@ -1,62 +1,144 @@
 # app/api/routes/lead.py
-import csv
-import io
 import logging
 import json
+from datetime import datetime
 from uuid import UUID
 from typing import Optional, List
-from fastapi import APIRouter, Query, Depends, HTTPException, Response, status, Path
+from fastapi import APIRouter, Query, Depends, HTTPException, Header, Response, status, Path
+from fastapi.responses import StreamingResponse, FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from app.core.database import get_db
-from app.dependencies import get_current_user
-from app.schemas.lead import LeadCreate, LeadUpdate, LeadResponse
+from app.dependencies import get_current_user, get_stream_user
+from app.schemas.lead import (
+    LeadCreate,
+    LeadUpdate,
+    LeadResponse,
+    LeadStatsResponse,
+    ExportJobResponse,
+    LeadChangesResponse,
+    LeadBatchGetRequest,
+    LeadBatchGetResponse,
+    LeadBulkUpdate,
+    LeadBulkResult,
+)
 from app.core.logger import logger
 from app.services.lead_service import (
     add_lead_service,
     fetch_leads_service,
     fetch_lead_service,
+    fetch_leads_by_ids_service,
     modify_lead_service,
     remove_lead_service,
-    export_leads_service,
+    bulk_modify_leads_service,
+    bulk_remove_leads_service,
+    fetch_lead_stats_service,
+    fetch_lead_changes_service,
 )
+from app.crud.lead_sync_crud import SyncCursorExpired
+from app.crud.lead_query import normalize_lead_query
+from app.core.deadline import QueryDeadlineExceeded
+from app.sse import event_stream_hub
 
 router = APIRouter()
 
 
-@router.get("/export-leads", response_class=Response)
+@router.get("/export-leads", response_class=StreamingResponse)
 async def export_leads(
-    db: AsyncSession = Depends(get_db),
+    search: Optional[str] = Query(None),
+    filters: Optional[str] = Query(None),  # JSON string, same format as /leads/leads
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    compress: bool = Query(False),  # gzip the file as it streams
     current_user=Depends(get_current_user)
 ):
     """
-    Export all leads as a CSV file.
+    Export the leads matching the given search/filters/sort as a CSV or NDJSON file.
     """
+    # Imported lazily: exports are rare and should not weigh on start-up
+    from app.services.export_service import export_leads_service, export_filename, export_media_type
     try:
-        logger.info("User requested lead export")
-        leads = await export_leads_service(db)
-        if not leads:
-            logger.warning("No leads found to export")
-        
-        # Create an in-memory CSV file
-        stream = io.StringIO()
-        writer = csv.writer(stream)
-        writer.writerow(["ID", "Name", "Company", "Email", "Phone", "Stage", "Engaged", "Last Contacted", "Created At"])
-        for lead in leads:
-            writer.writerow([
-                lead.id, lead.name, lead.company, lead.email,
-                lead.phone, lead.stage, lead.engaged,
-                lead.last_contacted, lead.created_at
-            ])
-        
-        response = Response(content=stream.getvalue(), media_type="text/csv")
-        response.headers["Content-Disposition"] = "attachment; filename=leads.csv"
+        filter_dict = json.loads(filters) if filters else {}
+        normalize_lead_query(search, filter_dict)  # reject invalid filters before the stream starts
+        logger.info(f"User requested lead export: format={export_format}, compress={compress}, search={search}, filters={filter_dict}")
+        response = StreamingResponse(
+            export_leads_service(search, filter_dict, export_format, compress),
+            media_type=export_media_type(export_format, compress),
+        )
+        response.headers["Content-Disposition"] = f"attachment; filename={export_filename(export_format, compress)}"
         return response
+    except ValueError:  # malformed JSON or an invalid filter
+        raise HTTPException(status_code=400, detail="Invalid filters format")
     except Exception as e:
         logger.error(f"Error exporting leads: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to export leads")
 
 
+def _export_job_response(job) -> ExportJobResponse:
+    return ExportJobResponse(
+        id=job.id,
+        status=job.status,
+        format=job.export_format,
+        compress=job.compress,
+        rows_written=job.rows_written,
+        total_rows=job.total_rows,
+        progress=min(job.rows_written / job.total_rows, 1.0) if job.total_rows else (1.0 if job.completed else None),
+        bytes_written=job.bytes_written,
+        created_at=datetime.fromtimestamp(job.created_at),
+        finished_at=datetime.fromtimestamp(job.finished_at) if job.finished_at else None,
+        error=job.error,
+        download_url=f"/leads/export-jobs/{job.id}/download" if job.completed else None,
+    )
+
+
+@router.post("/export-jobs", response_model=ExportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    search: Optional[str] = Query(None),
+    filters: Optional[str] = Query(None),  # JSON string, same format as /leads/leads
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    compress: bool = Query(False),
+    current_user=Depends(get_current_user)
+):
+    """
+    Start a background export. Identical requests of the same user made while a job is
+    running share that job; only that user can see and download it.
+    """
+    from app.services.export_jobs import export_jobs
+    try:
+        filter_dict = json.loads(filters) if filters else {}
+        normalize_lead_query(search, filter_dict)
+    except ValueError:  # malformed JSON or an invalid filter
+        raise HTTPException(status_code=400, detail="Invalid filters format")
+    logger.info(f"User requested export job: format={export_format}, compress={compress}, search={search}, filters={filter_dict}")
+    job = export_jobs.submit(search, filter_dict, export_format, compress, owner=current_user.get("id"))
+    return _export_job_response(job)
+
+
+@router.get("/export-jobs/{job_id}", response_model=ExportJobResponse)
+async def get_export_job(job_id: str, current_user=Depends(get_current_user)):
+    """
+    Report the progress of a background export.
+    """
+    from app.services.export_jobs import export_jobs
+    job = export_jobs.get(job_id, current_user.get("id"))
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return _export_job_response(job)
+
+
+@router.get("/export-jobs/{job_id}/download", response_class=FileResponse)
+async def download_export_job(job_id: str, current_user=Depends(get_current_user)):
+    """
+    Download the file of a completed export. Supports HTTP Range requests for resuming.
+    """
+    from app.services.export_jobs import export_jobs
+    job = export_jobs.get(job_id, current_user.get("id"))
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if not job.completed:
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+    return FileResponse(job.path, media_type=job.media_type, filename=job.filename)
+
+
 @router.post("/", response_model=LeadResponse, status_code=status.HTTP_201_CREATED)
 async def create_lead(
     lead: LeadCreate,
@@ -87,21 +169,158 @@ async def get_leads(
     filters: Optional[str] = Query(None),  # JSON string from query params
     sort_by: str = Query("created_at"),
     sort_order: str = Query("desc"),
+    facets: bool = Query(False),  # Include per-stage / per-engaged counts for the filtered set
     db: AsyncSession = Depends(get_db)
 ):
     try:
         filter_dict = json.loads(filters) if filters else {}
         logger.info(f"Decoded filters: {filter_dict}")
-        logger.info(f"Fetching leads: skip={skip}, limit={limit}, search={search}, sort_by={sort_by}, sort_order={sort_order}")
-        leads = await fetch_leads_service(db, skip, limit, search, sort_by, sort_order, filter_dict)
+        logger.info(f"Fetching leads: skip={skip}, limit={limit}, search={search}, sort_by={sort_by}, sort_order={sort_order}, facets={facets}")
+        leads = await fetch_leads_service(db, skip, limit, search, sort_by, sort_order, filter_dict, facets)
         return leads
-    except json.JSONDecodeError:
+    except ValueError:  # malformed JSON or an invalid filter, date or sortField
         raise HTTPException(status_code=400, detail="Invalid filters format")
+    except QueryDeadlineExceeded:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Query deadline exceeded")
     except Exception as e:
         logger.error(f"Error fetching leads: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error fetching leads")
 
 
+@router.patch("", response_model=LeadBulkResult)
+async def bulk_update_leads(
+    lead: LeadBulkUpdate,
+    search: Optional[str] = Query(None),
+    filters: Optional[str] = Query(None),  # JSON string, same grammar as GET /leads/leads
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Update every lead matching the search/filters.
+    A search or at least one filter is required; changes are committed in chunks.
+    """
+    try:
+        filter_dict = json.loads(filters) if filters else {}
+        logger.info(f"Bulk updating leads: search={search}, filters={filter_dict}")
+        return await bulk_modify_leads_service(db, search, filter_dict, lead, current_user)
+    except ValueError as e:  # malformed JSON, no selection, bad date or nothing to update
+        raise HTTPException(status_code=400, detail=f"Invalid bulk update: {e}")
+    except Exception as e:
+        logger.error(f"Error bulk updating leads: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error updating leads")
+
+
+@router.delete("", response_model=LeadBulkResult)
+async def bulk_delete_leads(
+    search: Optional[str] = Query(None),
+    filters: Optional[str] = Query(None),  # JSON string, same grammar as GET /leads/leads
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Delete every lead matching the search/filters.
+    A search or at least one filter is required; deletions are committed in chunks.
+    """
+    try:
+        filter_dict = json.loads(filters) if filters else {}
+        logger.info(f"Bulk deleting leads: search={search}, filters={filter_dict}")
+        return await bulk_remove_leads_service(db, search, filter_dict, current_user)
+    except ValueError as e:  # malformed JSON, no selection or bad date
+        raise HTTPException(status_code=400, detail=f"Invalid bulk delete: {e}")
+    except Exception as e:
+        logger.error(f"Error bulk deleting leads: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error deleting leads")
+
+
+@router.get("/stats", response_model=LeadStatsResponse)
+async def get_lead_stats(
+    filters: Optional[str] = Query(None),  # JSON string: stage, engaged, createdAtStart, createdAtEnd
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Pipeline statistics (counts per stage, engaged ratio, leads created per day)
+    served from the incrementally maintained summary table.
+    """
+    try:
+        filter_dict = json.loads(filters) if filters else {}
+        logger.info(f"Fetching lead stats: filters={filter_dict}")
+        return await fetch_lead_stats_service(db, filter_dict)
+    except (json.JSONDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid filters format")
+    except QueryDeadlineExceeded:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Query deadline exceeded")
+    except Exception as e:
+        logger.error(f"Error fetching lead stats: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error fetching lead stats")
+
+
+@router.get("/changes", response_model=LeadChangesResponse)
+async def get_lead_changes(
+    since: Optional[str] = Query(None),  # cursor from the previous response; omit for a full sync
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Delta sync: leads created or updated after the cursor, tombstones for deleted leads,
+    and the cursor for the next call. Keep calling while `has_more` is true.
+    Answers 410 when the cursor is too old and the client must resync from scratch.
+    """
+    try:
+        logger.info(f"Fetching lead changes: since={since}, limit={limit}")
+        return await fetch_lead_changes_service(db, since, limit)
+    except SyncCursorExpired:
+        raise HTTPException(status_code=410, detail="Sync cursor expired, full resync required")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+    except QueryDeadlineExceeded:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Query deadline exceeded")
+    except Exception as e:
+        logger.error(f"Error fetching lead changes: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error fetching lead changes")
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def stream_lead_events(
+    last_event_id: Optional[str] = Header(None),  # sent by EventSource when it reconnects
+    current_user=Depends(get_stream_user)
+):
+    """
+    Server-Sent Events feed of lead_created/lead_updated/lead_deleted (and bulk) events,
+    the same events as on /ws. Reconnecting with Last-Event-ID resumes after that event;
+    `resync_required` means the missed events are gone and the client must refetch.
+    EventSource cannot set headers, so the JWT may also be passed as `?access_token=`
+    or in an `access_token` cookie.
+    """
+    logger.info(f"Opening lead event stream: last_event_id={last_event_id}")
+    return StreamingResponse(
+        event_stream_hub.frames(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/batch-get", response_model=LeadBatchGetResponse)
+async def batch_get_leads(
+    request: LeadBatchGetRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Retrieve many leads by ID with one query.
+    `items` follows the order of `ids`, with null for IDs that were not found; those IDs are also listed in `missing`.
+    """
+    try:
+        logger.info(f"Fetching {len(request.ids)} leads by ID")
+        return await fetch_leads_by_ids_service(db, request.ids)
+    except QueryDeadlineExceeded:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Query deadline exceeded")
+    except Exception as e:
+        logger.error(f"Error fetching leads by ID: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error fetching leads")
+
+
 @router.get("/id/{lead_id}", response_model=LeadResponse)
 async def get_lead(
     lead_id: UUID = Path(..., title="Lead ID"),
@@ -140,6 +359,8 @@ async def update_lead(
             logger.warning(f"Lead {lead_id} not found")
             raise HTTPException(status_code=404, detail="Lead not found")
         return updated_lead
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error updating lead {lead_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to update lead")
@@ -1,13 +1,113 @@
 # app/core/database.py
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker, declarative_base
-from app.core.config import DATABASE_URL
+from sqlalchemy.sql.functions import now
+from app.core.config import (
+    DATABASE_URL,
+    DATABASE_SCHEMA,
+    DB_QUERY_CACHE_SIZE,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+)
+from app.core.metrics import register_metrics
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+# Applied to every SQLite connection: WAL lets readers run alongside the single writer,
+# and the rest trades a little durability on power loss for far fewer fsyncs
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "busy_timeout=5000",
+    "foreign_keys=ON",
+    "temp_store=MEMORY",
+    "cache_size=-32000",
+    "mmap_size=134217728",
+    # LIKE is case-insensitive by default on SQLite; `prefix` filters match case as on PostgreSQL
+    "case_sensitive_like=ON",
+)
+
+connect_args = {}
+engine_args = {}
+if DATABASE_URL.startswith("postgresql+asyncpg"):
+    # Sized for every lead list statement shape times its variants (page, count, facets, stream)
+    connect_args["prepared_statement_cache_size"] = DB_STATEMENT_CACHE_SIZE
+    if DATABASE_SCHEMA:
+        connect_args["server_settings"] = {"search_path": DATABASE_SCHEMA}
+if not DATABASE_URL.startswith("sqlite"):
+    # SQLite uses the pool its dialect picks for the URL (a single connection for :memory:)
+    engine_args.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    future=True,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+    connect_args=connect_args,
+    **engine_args,
+)
 SessionLocal = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
 
 Base = declarative_base()
 
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+
+@compiles(now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    # CURRENT_TIMESTAMP has no fractional seconds; match the text format SQLAlchemy uses
+    # for DateTime on SQLite so values set by the database and by Python compare correctly
+    return "STRFTIME('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+# Hit/miss counters of SQLAlchemy's compiled-statement cache
+compile_cache_stats = {"hits": 0, "misses": 0}
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _count_compile_cache(conn, cursor, statement, parameters, context, executemany):
+    if context.cache_hit is CACHE_HIT:
+        compile_cache_stats["hits"] += 1
+    elif context.cache_hit is CACHE_MISS:
+        compile_cache_stats["misses"] += 1
+
+
+def _compile_cache_size():
+    """
+    Entries in the engine's compiled cache, or None when it cannot be inspected.
+    """
+    # `_compiled_cache` is private SQLAlchemy API, so only read it if it looks as expected
+    cache = getattr(engine.sync_engine, "_compiled_cache", None)
+    try:
+        return len(cache) if cache is not None else None
+    except TypeError:
+        return None
+
+
+def _compile_cache_snapshot() -> dict:
+    lookups = compile_cache_stats["hits"] + compile_cache_stats["misses"]
+    return {
+        **compile_cache_stats,
+        "hit_rate": compile_cache_stats["hits"] / lookups if lookups else None,
+        "size": _compile_cache_size(),
+        "capacity": DB_QUERY_CACHE_SIZE,
+        "prepared_statement_cache_size": connect_args.get("prepared_statement_cache_size"),
+    }
+
+
+register_metrics("sql_compile_cache", _compile_cache_snapshot)
+
+
 async def get_db():
     """
     Dependency that provides a new database session for each request.
@@ -0,0 +1,50 @@
+# app/core/deadline.py
+import asyncio
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.metrics import register_metrics
+
+# PostgreSQL's SQLSTATE for a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+# Extra time the server gets to cancel the statement itself before the request gives up
+CANCEL_GRACE_SECONDS = 0.5
+
+deadline_stats = {"exceeded": 0}
+register_metrics("query_deadlines", lambda: dict(deadline_stats))
+
+
+class QueryDeadlineExceeded(Exception):
+    """
+    The queries of a request ran past the route's deadline and were cancelled.
+    """
+
+
+@asynccontextmanager
+async def query_deadline(db: AsyncSession, seconds: float):
+    """
+    Bound the time the queries run on `db` inside the block may take.
+
+    On PostgreSQL the deadline is set as the transaction's statement_timeout, so the
+    server cancels a runaway statement and the pooled connection is freed right away.
+    On every database the block is also cancelled shortly after the deadline.
+    Raises QueryDeadlineExceeded in both cases; a `seconds` of 0 disables the deadline.
+    """
+    if not seconds:
+        yield
+        return
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text(f"SET LOCAL statement_timeout = {int(seconds * 1000)}"))
+    try:
+        async with asyncio.timeout(seconds + CANCEL_GRACE_SECONDS):
+            yield
+    except TimeoutError:
+        deadline_stats["exceeded"] += 1
+        raise QueryDeadlineExceeded(f"Query exceeded its {seconds}s deadline")
+    except DBAPIError as e:
+        if getattr(e.orig, "sqlstate", None) != QUERY_CANCELED:
+            raise
+        deadline_stats["exceeded"] += 1
+        raise QueryDeadlineExceeded(f"Query exceeded its {seconds}s deadline") from e
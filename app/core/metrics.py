@@ -0,0 +1,19 @@
+# app/core/metrics.py
+from typing import Callable, Dict
+
+# Metric section name -> callable returning a JSON-serializable snapshot
+_providers: Dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], dict]) -> None:
+    """
+    Register a snapshot provider exposed under `name` on the /metrics endpoint.
+    """
+    _providers[name] = provider
+
+
+def collect_metrics() -> dict:
+    """
+    Collect a snapshot from every registered provider.
+    """
+    return {name: provider() for name, provider in _providers.items()}
@@ -0,0 +1,204 @@
+# app/core/partitions.py
+"""
+Maintenance of the monthly `leads` partitions on PostgreSQL.
+
+    python -m app.core.partitions ensure [--months-ahead 3]
+    python -m app.core.partitions archive --before 2025-01
+    python -m app.core.partitions explain --filters '{"createdAtStart": "2026-01-01"}'
+
+With createdAtStart/createdAtEnd only the partitions of those months are scanned, e.g.
+(PostgreSQL 16, partitions 2026-10 to 2027-01 and the default):
+
+    $ python -m app.core.partitions explain --filters '{"createdAtStart": "2026-11-01", "createdAtEnd": "2026-11-30"}'
+    Aggregate  (cost=9.52..9.53 rows=1 width=8)
+      ->  Bitmap Heap Scan on leads_y2026m11 leads  (cost=4.17..9.51 rows=2 width=0)
+            Recheck Cond: ((created_at >= '2026-11-01 00:00:00'::timestamp without time zone) AND ...)
+
+while the unfiltered count appends a scan of every partition, leads_default included.
+"""
+import argparse
+import asyncio
+import json
+from datetime import date, datetime
+from sqlalchemy import text
+from app.core.config import LEAD_PARTITION_MONTHS_AHEAD
+from app.core.logger import logger
+
+ARCHIVE_SCHEMA = "archive"
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"leads_y{month.year}m{month.month:02d}"
+
+
+def parse_month(value: str) -> date:
+    """
+    Parse YYYY-MM (or a YYYY-MM-DD date) into the first day of that month.
+    """
+    for fmt in ("%Y-%m", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).date().replace(day=1)
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid month: {value}")
+
+
+async def leads_is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('leads')"
+    ))
+    return result.scalar() is not None
+
+
+async def lead_partitions(conn) -> dict:
+    """
+    Return {month: partition name} for the monthly partitions currently attached to `leads`.
+    """
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('leads')"
+    ))
+    partitions = {}
+    for (name,) in result:
+        if name.startswith("leads_y"):
+            partitions[date(int(name[7:11]), int(name[12:14]), 1)] = name
+    return partitions
+
+
+def create_partition_sql(month: date) -> list:
+    return [
+        f"CREATE TABLE {partition_name(month)} PARTITION OF leads "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ]
+
+
+def move_default_rows_sql(month: date) -> list:
+    """
+    Statements creating the partition of `month` when the default partition already
+    holds rows of that month (which makes CREATE TABLE ... PARTITION OF fail): the rows
+    are moved into a standalone table that is then attached. Detached or standalone
+    tables carry no email registry trigger, so lead_emails is left untouched.
+    """
+    name = partition_name(month)
+    bounds = f"created_at >= '{month.isoformat()}' AND created_at < '{add_months(month, 1).isoformat()}'"
+    return [
+        "ALTER TABLE leads DETACH PARTITION leads_default",
+        f"CREATE TABLE {name} (LIKE leads INCLUDING DEFAULTS)",
+        f"INSERT INTO {name} SELECT * FROM leads_default WHERE {bounds}",
+        f"DELETE FROM leads_default WHERE {bounds}",
+        f"ALTER TABLE leads ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')",
+        "ALTER TABLE leads ATTACH PARTITION leads_default DEFAULT",
+    ]
+
+
+async def _default_has_rows(conn, month: date) -> bool:
+    result = await conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM leads_default WHERE created_at >= :lower AND created_at < :upper)"),
+        {"lower": month, "upper": add_months(month, 1)},
+    )
+    return bool(result.scalar())
+
+
+async def ensure_lead_partitions(conn, months_ahead: int = LEAD_PARTITION_MONTHS_AHEAD) -> list:
+    """
+    Create the partitions from the current month to `months_ahead` months ahead that are
+    missing, moving rows of those months out of the default partition if it has any.
+    Does nothing unless `leads` is partitioned. Returns the partitions created.
+    """
+    if not await leads_is_partitioned(conn):
+        return []
+    existing = await lead_partitions(conn)
+    created = []
+    month = date.today().replace(day=1)
+    for _ in range(months_ahead + 1):
+        if month not in existing:
+            if await _default_has_rows(conn, month):
+                logger.warning(f"Moving rows of {month:%Y-%m} out of leads_default into {partition_name(month)}")
+                statements = move_default_rows_sql(month)
+            else:
+                statements = create_partition_sql(month)
+            for statement in statements:
+                await conn.execute(text(statement))
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    if created:
+        logger.info(f"Created lead partitions: {created}")
+    return created
+
+
+async def archive_lead_partitions(conn, before: date) -> list:
+    """
+    Detach the partitions of the months before `before` and move them to the
+    archive schema. Archived leads leave the pipeline: their emails are released,
+    their summary buckets are removed and delta-sync clients receive tombstones.
+    Returns the partitions archived.
+    """
+    if not await leads_is_partitioned(conn):
+        raise RuntimeError("leads is not partitioned")
+    await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    archived = []
+    for month, name in sorted((await lead_partitions(conn)).items()):
+        upper = add_months(month, 1)
+        if upper > before:
+            continue
+        await conn.execute(text(f"ALTER TABLE leads DETACH PARTITION {name}"))
+        await conn.execute(text(f"INSERT INTO lead_deletions (lead_id, deleted_at) SELECT id, now() FROM {name}"))
+        await conn.execute(text(f"DELETE FROM lead_emails WHERE lead_id IN (SELECT id FROM {name})"))
+        await conn.execute(
+            text("DELETE FROM lead_daily_stats WHERE day >= :lower AND day < :upper"),
+            {"lower": month, "upper": upper},
+        )
+        await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}"))
+        archived.append(name)
+        logger.info(f"Archived lead partition {name} to {ARCHIVE_SCHEMA}.{name}")
+    return archived
+
+
+async def explain_lead_query(conn, search: str = None, filters: dict = None) -> str:
+    """
+    EXPLAIN the lead list COUNT for the given search/filters, to check which partitions
+    the createdAtStart/createdAtEnd filters prune.
+    """
+    from app.crud.lead_query import normalize_lead_query, lead_statements
+
+    shape, params = normalize_lead_query(search, filters)
+    stmt = lead_statements.get("count", shape).params(**params)
+    sql = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    result = await conn.exec_driver_sql(f"EXPLAIN {sql}")
+    return "\n".join(row[0] for row in result)
+
+
+async def _main(args) -> None:
+    from app.core.database import engine
+
+    try:
+        async with engine.begin() as conn:
+            if args.command == "ensure":
+                print(await ensure_lead_partitions(conn, args.months_ahead))
+            elif args.command == "archive":
+                print(await archive_lead_partitions(conn, parse_month(args.before)))
+            else:
+                print(await explain_lead_query(conn, args.search, json.loads(args.filters) if args.filters else {}))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the monthly leads partitions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="create missing partitions up to N months ahead")
+    ensure.add_argument("--months-ahead", type=int, default=LEAD_PARTITION_MONTHS_AHEAD)
+    archive = commands.add_parser("archive", help="move the partitions of months before a given month to the archive schema")
+    archive.add_argument("--before", required=True, help="YYYY-MM; every month before it is archived")
+    explain = commands.add_parser("explain", help="show the plan (and pruned partitions) of a lead list query")
+    explain.add_argument("--search")
+    explain.add_argument("--filters", help="JSON filters, as for GET /leads/leads")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,48 @@
+# app/core/singleflight.py
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for `key` is in flight, further
+    calls for the same key wait for it and share its result (or exception) instead of
+    running again.
+
+    The shared call runs in its own task, so a caller that goes away does not cancel
+    it for the others. `invalidate` makes later callers start a fresh call, e.g. after
+    a write that the in-flight call may not see.
+    """
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            self.executions += 1
+            flight = asyncio.ensure_future(fn())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(flight)
+
+    def invalidate(self) -> None:
+        self._flights.clear()
+
+    def _forget(self, key: Hashable, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled():
+            flight.exception()  # retrieved even if every caller went away
+
+    def snapshot(self) -> dict:
+        coalesced = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "coalesced_ratio": coalesced / self.calls if self.calls else None,
+            "in_flight": len(self._flights),
+        }
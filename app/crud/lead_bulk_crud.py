@@ -0,0 +1,166 @@
+# app/crud/lead_bulk_crud.py
+from collections import Counter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import update, delete, insert, bindparam
+from app.models.lead import Lead
+from app.models.lead_deletion import LeadDeletion
+from app.crud.lead_query import normalize_lead_query, _where
+from app.crud.lead_stats_crud import lead_stats_key, bump_lead_stats
+from app.core.config import LEAD_BULK_CHUNK_SIZE
+from app.core.logger import logger
+from app.outbox import enqueue_lead_event, outbox_dispatcher
+
+
+def normalize_bulk_query(search: str = None, filters: dict = None):
+    """
+    Normalize search/filters like the lead list does, but refuse an empty selection
+    (which would touch every lead).
+    """
+    shape, params = normalize_lead_query(search, filters)
+    if not params:
+        raise ValueError("Bulk operations require a search or at least one filter")
+    return shape, params
+
+
+def _chunk_stmt(shape, first: bool):
+    # Next chunk of matching leads in ID order, locked until the chunk commits
+    stmt = _where(select(Lead.id, Lead.created_at, Lead.stage, Lead.engaged), shape)
+    if not first:
+        stmt = stmt.filter(Lead.id > bindparam("after_id"))
+    return stmt.order_by(Lead.id).limit(bindparam("chunk_size")).with_for_update()
+
+
+def _stats_deltas(rows, new_values: dict = None) -> Counter:
+    """
+    Net change per summary bucket when `rows` are deleted (no `new_values`)
+    or updated with `new_values`.
+    """
+    deltas = Counter()
+    for row in rows:
+        old_key = lead_stats_key(row)
+        deltas[old_key] -= 1
+        if new_values is not None:
+            day, stage, engaged = old_key
+            new_key = (
+                day,
+                (new_values["stage"] or "") if "stage" in new_values else stage,
+                bool(new_values["engaged"]) if "engaged" in new_values else engaged,
+            )
+            deltas[new_key] += 1
+    return deltas
+
+
+async def _bump_stats(db: AsyncSession, deltas: Counter):
+    for key, delta in deltas.items():
+        if delta:
+            await bump_lead_stats(db, key, delta)
+
+
+async def _run_in_chunks(db: AsyncSession, search, filters, chunk_size: int, apply, event, on_commit=None):
+    """
+    Apply a set-based change to the matching leads `chunk_size` (default
+    LEAD_BULK_CHUNK_SIZE) at a time. Each chunk
+    is its own transaction, so row locks are only held for one chunk, and is announced
+    with one aggregated event. Returns the number of leads affected and of chunks.
+    """
+    shape, params = normalize_bulk_query(search, filters)
+    chunk_size = chunk_size or LEAD_BULK_CHUNK_SIZE
+    first_stmt, next_stmt = _chunk_stmt(shape, True), _chunk_stmt(shape, False)
+    after_id = None
+    affected = 0
+    chunks = 0
+    while True:
+        if after_id is None:
+            rows = (await db.execute(first_stmt, {**params, "chunk_size": chunk_size})).all()
+        else:
+            rows = (await db.execute(next_stmt, {**params, "chunk_size": chunk_size, "after_id": after_id})).all()
+        if not rows:
+            break
+
+        ids = [row.id for row in rows]
+        try:
+            await apply(db, rows, ids)
+            enqueue_lead_event(db, event(ids))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logger.error(f"Error during commit of bulk chunk {chunks + 1}: {e}", exc_info=True)
+            raise e
+        if on_commit is not None:
+            on_commit()
+        outbox_dispatcher.notify()
+
+        affected += len(ids)
+        chunks += 1
+        after_id = ids[-1]
+        if len(ids) < chunk_size:
+            break
+    return affected, chunks
+
+
+async def bulk_update_leads(
+    db: AsyncSession,
+    search: str,
+    filters: dict,
+    values: dict,
+    current_user: dict,
+    chunk_size: int = None,
+    on_commit=None
+):
+    """
+    Update every lead matching the list search/filters with `values`.
+    """
+    async def apply(db, rows, ids):
+        await db.execute(
+            update(Lead).where(Lead.id.in_(ids)).values(**values),
+            execution_options={"synchronize_session": False},
+        )
+        await _bump_stats(db, _stats_deltas(rows, values))
+
+    def event(ids):
+        return {
+            "event": "leads_bulk_updated",
+            "lead_ids": [str(lead_id) for lead_id in ids],
+            "updated_data": {key: value for key, value in values.items() if key != "last_contacted"},
+            "source": current_user.get("id"),
+            "sourceName": current_user.get("name"),
+            "message": f"{current_user.get('name')} updated {len(ids)} leads"
+        }
+
+    affected, chunks = await _run_in_chunks(db, search, filters, chunk_size, apply, event, on_commit)
+    logger.info(f"Bulk updated {affected} leads in {chunks} chunks")
+    return {"affected": affected, "chunks": chunks}
+
+
+async def bulk_delete_leads(
+    db: AsyncSession,
+    search: str,
+    filters: dict,
+    current_user: dict,
+    chunk_size: int = None,
+    on_commit=None
+):
+    """
+    Delete every lead matching the list search/filters, leaving tombstones for delta sync.
+    """
+    async def apply(db, rows, ids):
+        await db.execute(
+            delete(Lead).where(Lead.id.in_(ids)),
+            execution_options={"synchronize_session": False},
+        )
+        await db.execute(insert(LeadDeletion), [{"lead_id": lead_id} for lead_id in ids])
+        await _bump_stats(db, _stats_deltas(rows))
+
+    def event(ids):
+        return {
+            "event": "leads_bulk_deleted",
+            "lead_ids": [str(lead_id) for lead_id in ids],
+            "source": current_user.get("id"),
+            "sourceName": current_user.get("name"),
+            "message": f"{current_user.get('name')} deleted {len(ids)} leads"
+        }
+
+    affected, chunks = await _run_in_chunks(db, search, filters, chunk_size, apply, event, on_commit)
+    logger.info(f"Bulk deleted {affected} leads in {chunks} chunks")
+    return {"affected": affected, "chunks": chunks}
@@ -1,14 +1,16 @@
 # app/crud/lead_crud.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, asc, desc, or_
+from sqlalchemy import bindparam, any_, Uuid
+from sqlalchemy.dialects.postgresql import ARRAY
 from app.models.lead import Lead
+from app.models.lead_deletion import LeadDeletion
 from app.schemas.lead import LeadCreate, LeadUpdate
 from app.core.logger import logger
 from uuid import UUID
-import json
-from datetime import datetime
-from app.websockets import manager  # WebSocket manager
+from app.outbox import enqueue_lead_event, outbox_dispatcher  # lead events go through the outbox
+from app.crud.lead_stats_crud import lead_stats_key, bump_lead_stats, move_lead_stats
+from app.crud.lead_query import normalize_lead_query, lead_statements
 
 
 async def create_lead(db: AsyncSession, lead: LeadCreate, current_user: dict):
@@ -18,27 +20,53 @@ async def create_lead(db: AsyncSession, lead: LeadCreate, current_user: dict):
     new_lead = Lead(**lead.model_dump())
     db.add(new_lead)
     try:
+        await db.flush()
+        await bump_lead_stats(db, lead_stats_key(new_lead), 1)
+
+        created_lead_data = lead.model_dump()
+        created_lead_data.pop("last_contacted", None)
+
+        # Notify via WebSocket about the new lead, once committed
+        new_lead_message = {
+            "event": "lead_created",
+            "lead_id": str(new_lead.id),
+            "lead_data": created_lead_data,
+            "source": current_user.get("id"),
+            "sourceName": current_user.get("name"),
+            "message": f"{current_user.get('name')} added a new lead: {new_lead.name}"
+        }
+        enqueue_lead_event(db, new_lead_message)
         await db.commit()
     except Exception as e:
         await db.rollback()
         logger.error(f"Error during commit in create_lead: {e}", exc_info=True)
         raise e
+    outbox_dispatcher.notify()
     await db.refresh(new_lead)
+    return new_lead
 
-    created_lead_data = lead.model_dump()
-    created_lead_data.pop("last_contacted", None)
 
-    # Notify via WebSocket about the new lead
-    new_lead_message = {
-        "event": "lead_created",
-        "lead_id": str(new_lead.id),
-        "lead_data": created_lead_data,
-        "source": current_user.get("id"),
-        "sourceName": current_user.get("name"),
-        "message": f"{current_user.get('name')} added a new lead: {new_lead.name}"
-    }
-    await manager.broadcast(json.dumps(new_lead_message))
-    return new_lead
+async def _get_leads_with_facets(db: AsyncSession, shape, params: dict):
+    """
+    Fetch the page together with the per-stage and per-engaged counts of the filtered
+    leads and their total, in a single statement (one round trip).
+    """
+    items = []
+    total = 0
+    facets = {"stage": [], "engaged": []}
+    columns = [column.key for column in Lead.__table__.columns]
+    for row in (await db.execute(lead_statements.get("page_facets", shape), params)).mappings():
+        kind = row["row_kind"]
+        if kind == "item":
+            items.append((row["position"], Lead(**{key: row[key] for key in columns})))
+        elif kind == "total":
+            total = row["count"]
+        elif kind == "stage":
+            facets["stage"].append({"value": row["facet_value"], "count": row["count"]})
+        else:
+            facets["engaged"].append({"value": row["engaged_value"], "count": row["count"]})
+    items.sort(key=lambda item: item[0])
+    return [lead for _, lead in items], total, facets
 
 
 async def get_leads(
@@ -48,57 +76,22 @@ async def get_leads(
     search: str = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
-    filters: dict = None
+    filters: dict = None,
+    facets: bool = False
 ):
-    stmt = select(Lead)
-    if search:
-        stmt = stmt.filter(
-            or_(
-                Lead.name.ilike(f"%{search}%"),
-                Lead.email.ilike(f"%{search}%"),
-                Lead.company.ilike(f"%{search}%")
-            )
-        )
-    if filters:
-        if filters.get("stage"):
-            stmt = stmt.filter(Lead.stage == filters["stage"])
-        if filters.get("engaged"):
-            engaged_value = filters["engaged"].lower() == "true"
-            stmt = stmt.filter(Lead.engaged == engaged_value)
-        if filters.get("createdAtStart"):
-            try:
-                start_date = datetime.strptime(filters["createdAtStart"], "%Y-%m-%d")
-                stmt = stmt.filter(Lead.created_at >= start_date)
-            except Exception as e:
-                logger.info(f"Error parsing createdAtStart: {e}")
-        if filters.get("createdAtEnd"):
-            try:
-                end_date = datetime.strptime(filters["createdAtEnd"], "%Y-%m-%d")
-                stmt = stmt.filter(Lead.created_at <= end_date)
-            except Exception as e:
-                logger.error(f"Error parsing createdAtEnd: {e}")
-        if filters.get("sortField"):
-            sort_field = filters["sortField"]
-            sort_order = filters.get("sortOrder", "desc")
-            order_clause = asc(getattr(Lead, sort_field)) if sort_order.lower() == "asc" else desc(getattr(Lead, sort_field))
-            stmt = stmt.order_by(order_clause)
-        else:
-            stmt = stmt.order_by(desc(Lead.created_at))
-    else:
-        stmt = stmt.order_by(desc(Lead.created_at))
-
-    # Calculate total count using a subquery
-    total_stmt = select(func.count()).select_from(stmt.subquery())
-    total = (await db.execute(total_stmt)).scalar_one()
+    shape, params = normalize_lead_query(search, filters)
+    page_params = {**params, "skip": skip, "limit": limit}
 
-    # Apply pagination
-    stmt = stmt.offset(skip).limit(limit)
-    leads = (await db.execute(stmt)).scalars().all()
+    if facets:
+        # The page, the facets and the total come back from one statement
+        leads, total, facet_counts = await _get_leads_with_facets(db, shape, page_params)
+        return {"items": leads, "total": total, "facets": facet_counts}
 
+    total = (await db.execute(lead_statements.get("count", shape), params)).scalar_one()
+    leads = (await db.execute(lead_statements.get("page", shape), page_params)).scalars().all()
     return {"items": leads, "total": total}
 
 
-
 async def get_lead(db: AsyncSession, lead_id: UUID):
     """
     Retrieve a lead by ID.
@@ -108,6 +101,23 @@ async def get_lead(db: AsyncSession, lead_id: UUID):
     return result.scalar_one_or_none()
 
 
+# On PostgreSQL the whole ID list is one array parameter, so every batch size shares one
+# statement (and prepared statement); other databases expand it into an IN list
+_leads_by_ids_any = select(Lead).filter(Lead.id == any_(bindparam("ids", type_=ARRAY(Uuid))))
+_leads_by_ids_in = select(Lead).filter(Lead.id.in_(bindparam("ids", expanding=True)))
+
+
+async def get_leads_by_ids(db: AsyncSession, lead_ids: list):
+    """
+    Retrieve many leads by ID with a single query.
+    Returns a dict mapping each found ID to its lead.
+    """
+    ids = list(dict.fromkeys(lead_ids))
+    stmt = _leads_by_ids_any if db.bind.dialect.name == "postgresql" else _leads_by_ids_in
+    result = await db.execute(stmt, {"ids": ids})
+    return {lead.id: lead for lead in result.scalars()}
+
+
 async def update_lead(db: AsyncSession, lead_id: UUID, lead_update: LeadUpdate, current_user: dict):
     """
     Update an existing lead and notify connected clients.
@@ -116,30 +126,33 @@ async def update_lead(db: AsyncSession, lead_id: UUID, lead_update: LeadUpdate,
     if not db_lead:
         return None
 
+    old_stats_key = lead_stats_key(db_lead)
     update_data = lead_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_lead, key, value)
 
-    try:
-        await db.commit()
-    except Exception as e:
-        await db.rollback()
-        logger.error(f"Error during commit in update_lead: {e}", exc_info=True)
-        raise e
-    await db.refresh(db_lead)
-
-    update_data.pop("last_contacted", None)
+    event_data = {key: value for key, value in update_data.items() if key != "last_contacted"}
 
-    # Broadcast update event
+    # Broadcast update event, once committed
     update_message = {
         "event": "lead_updated",
         "lead_id": str(lead_id),
-        "updated_data": update_data,
+        "updated_data": event_data,
         "source": current_user.get("id"),
         "sourceName": current_user.get("name"),
         "message": f"{current_user.get('name')} updated lead {db_lead.name}"
     }
-    await manager.broadcast(json.dumps(update_message))
+
+    try:
+        await move_lead_stats(db, old_stats_key, lead_stats_key(db_lead))
+        enqueue_lead_event(db, update_message)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error during commit in update_lead: {e}", exc_info=True)
+        raise e
+    outbox_dispatcher.notify()
+    await db.refresh(db_lead)
     return db_lead
 
 
@@ -152,14 +165,9 @@ async def delete_lead(db: AsyncSession, lead_id: UUID, current_user: dict):
         return None
 
     await db.delete(db_lead)
-    try:
-        await db.commit()
-    except Exception as e:
-        await db.rollback()
-        logger.error(f"Error during commit in delete_lead: {e}", exc_info=True)
-        raise e
+    db.add(LeadDeletion(lead_id=db_lead.id))  # tombstone for /leads/changes
 
-    # Broadcast delete event
+    # Broadcast delete event, once committed
     delete_message = {
         "event": "lead_deleted",
         "lead_id": str(lead_id),
@@ -167,14 +175,33 @@ async def delete_lead(db: AsyncSession, lead_id: UUID, current_user: dict):
         "sourceName": current_user.get("name"),
         "message": f"{current_user.get('name')} deleted lead {db_lead.name}"
     }
-    await manager.broadcast(json.dumps(delete_message))
+    enqueue_lead_event(db, delete_message)
+    try:
+        await bump_lead_stats(db, lead_stats_key(db_lead), -1)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error during commit in delete_lead: {e}", exc_info=True)
+        raise e
+    outbox_dispatcher.notify()
     return db_lead
 
 
-async def get_all_leads(db: AsyncSession):
+async def count_leads(db: AsyncSession, search: str = None, filters: dict = None) -> int:
     """
-    Retrieve all leads for CSV export.
+    Count the leads matching the list search/filters.
     """
-    stmt = select(Lead)
-    result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    shape, params = normalize_lead_query(search, filters)
+    return (await db.execute(lead_statements.get("count", shape), params)).scalar_one()
+
+
+async def stream_leads(db: AsyncSession, search: str = None, filters: dict = None, chunk_size: int = 1000):
+    """
+    Stream the leads matching the list search/filters/sort for export,
+    fetching `chunk_size` rows at a time instead of loading the whole result.
+    """
+    shape, params = normalize_lead_query(search, filters)
+    stmt = lead_statements.get("stream", shape)
+    result = await db.stream_scalars(stmt, params, execution_options={"yield_per": chunk_size})
+    async for lead in result:
+        yield lead
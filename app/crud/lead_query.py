@@ -0,0 +1,273 @@
+# app/crud/lead_query.py
+from datetime import datetime, timezone
+from typing import Dict, List, Literal
+from uuid import UUID
+from pydantic import TypeAdapter
+from sqlalchemy.future import select
+from sqlalchemy import func, asc, desc, and_, or_, union_all, literal, cast, null, bindparam, String, Boolean, Integer
+from app.models.lead import Lead
+from app.core.config import LEAD_FILTER_MAX_CONDITIONS, LEAD_FILTER_MAX_DEPTH, LEAD_FILTER_MAX_IN_VALUES
+from app.core.metrics import register_metrics
+from app.schemas.lead import LeadFilterNode, LeadFilterCondition, LeadFilterAnd
+
+# Columns the list can be sorted by: those leading an index, so a sort never scans and
+# sorts the whole table
+SORTABLE_FIELDS = frozenset(
+    [index.columns[0].key for index in Lead.__table__.indexes]
+    + [column.key for column in Lead.__table__.primary_key]
+)
+
+# Fields the `where` filter accepts (all indexed) with their value type and operators
+FILTER_FIELDS = {
+    "id": (UUID, ("eq", "in")),
+    "name": (str, ("eq", "in", "prefix")),
+    "email": (str, ("eq", "in", "prefix")),
+    "company": (str, ("eq", "in", "prefix")),
+    "stage": (str, ("eq", "in", "prefix")),
+    "created_at": (datetime, ("range",)),
+    "updated_at": (datetime, ("range",)),
+}
+
+_filter_node = TypeAdapter(LeadFilterNode)
+
+
+def _naive_utc(value):
+    # Timestamps are stored as naive UTC
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class _WhereCompiler:
+    """
+    Turns a validated `where` tree into a hashable structure for the statement shape,
+    with every value moved to a bound parameter (w0, w1, ...).
+    """
+    def __init__(self, params: dict) -> None:
+        self.params = params
+        self.conditions = 0
+
+    def compile(self, node, depth: int = 1):
+        if depth > LEAD_FILTER_MAX_DEPTH:
+            raise ValueError(f"Filter nested deeper than {LEAD_FILTER_MAX_DEPTH} levels")
+        if isinstance(node, LeadFilterCondition):
+            return self._condition(node)
+        combinator, nodes = ("and", node.all_of) if isinstance(node, LeadFilterAnd) else ("or", node.any_of)
+        return (combinator, tuple(self.compile(child, depth + 1) for child in nodes))
+
+    def _condition(self, node: LeadFilterCondition):
+        self.conditions += 1
+        if self.conditions > LEAD_FILTER_MAX_CONDITIONS:
+            raise ValueError(f"Filter has more than {LEAD_FILTER_MAX_CONDITIONS} conditions")
+        if node.field not in FILTER_FIELDS:
+            raise ValueError(f"Cannot filter on {node.field}")
+        value_type, ops = FILTER_FIELDS[node.field]
+        if node.op not in ops:
+            raise ValueError(f"Operator {node.op} is not supported for {node.field}")
+
+        name = f"w{self.conditions - 1}"
+        if node.op == "eq":
+            self.params[name] = TypeAdapter(value_type).validate_python(node.value)
+        elif node.op == "in":
+            values = TypeAdapter(List[value_type]).validate_python(node.value)
+            if not 0 < len(values) <= LEAD_FILTER_MAX_IN_VALUES:
+                raise ValueError(f"in takes 1 to {LEAD_FILTER_MAX_IN_VALUES} values")
+            self.params[name] = tuple(values)
+        elif node.op == "prefix":
+            prefix = TypeAdapter(str).validate_python(node.value)
+            if not prefix:
+                raise ValueError("prefix must not be empty")
+            self.params[name] = _escape_like(prefix) + "%"
+        else:
+            bounds = TypeAdapter(Dict[Literal["gte", "lt"], value_type]).validate_python(node.value)
+            if not bounds:
+                raise ValueError("range takes gte and/or lt")
+            for bound, value in bounds.items():
+                self.params[f"{name}_{bound}"] = _naive_utc(value)
+            name = tuple(f"{name}_{bound}" for bound in sorted(bounds))
+        return ("cond", node.field, node.op, name)
+
+
+def _parse_date(filters: dict, key: str) -> datetime:
+    try:
+        return datetime.strptime(filters[key], "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {key}: {filters[key]}")
+
+
+def normalize_lead_query(search: str = None, filters: dict = None):
+    """
+    Normalize the list search/filters into a statement shape and its bound parameters.
+
+    The shape only records which predicates are present, the structure of the `where`
+    filter and how the result is sorted, so every request with the same combination
+    reuses one statement; the values travel as parameters.
+
+    Raises ValueError (pydantic's ValidationError included) for an invalid filter.
+    """
+    filters = filters or {}
+    params = {}
+
+    if search:
+        params["search"] = f"%{search}%"
+    if filters.get("stage"):
+        params["stage"] = filters["stage"]
+    if filters.get("engaged"):
+        params["engaged"] = filters["engaged"].lower() == "true"
+    if filters.get("createdAtStart"):
+        params["created_at_start"] = _parse_date(filters, "createdAtStart")
+    if filters.get("createdAtEnd"):
+        params["created_at_end"] = _parse_date(filters, "createdAtEnd")
+
+    where = None
+    if filters.get("where"):
+        where = _WhereCompiler(params).compile(_filter_node.validate_python(filters["where"]))
+
+    sort_field = "created_at"
+    sort_desc = True
+    if filters.get("sortField"):
+        sort_field = filters["sortField"]
+        if sort_field not in SORTABLE_FIELDS:
+            raise ValueError(f"Invalid sortField: {sort_field}")
+        sort_desc = filters.get("sortOrder", "desc").lower() != "asc"
+
+    shape = (tuple(sorted(params)), sort_field, sort_desc, where)
+    return shape, params
+
+
+def _where_clause(node):
+    if node[0] != "cond":
+        return (and_ if node[0] == "and" else or_)(*(_where_clause(child) for child in node[1]))
+    _, field, op, name = node
+    column = getattr(Lead, field)
+    if op == "eq":
+        return column == bindparam(name)
+    if op == "in":
+        return column.in_(bindparam(name, expanding=True))
+    if op == "prefix":
+        return column.like(bindparam(name), escape="\\")
+    return and_(*(
+        column >= bindparam(param) if param.endswith("_gte") else column < bindparam(param)
+        for param in name
+    ))
+
+
+def _where(stmt, shape):
+    predicates = shape[0]
+    if "search" in predicates:
+        pattern = bindparam("search")
+        stmt = stmt.filter(
+            or_(
+                Lead.name.ilike(pattern),
+                Lead.email.ilike(pattern),
+                Lead.company.ilike(pattern)
+            )
+        )
+    if "stage" in predicates:
+        stmt = stmt.filter(Lead.stage == bindparam("stage"))
+    if "engaged" in predicates:
+        stmt = stmt.filter(Lead.engaged == bindparam("engaged"))
+    if "created_at_start" in predicates:
+        stmt = stmt.filter(Lead.created_at >= bindparam("created_at_start"))
+    if "created_at_end" in predicates:
+        stmt = stmt.filter(Lead.created_at <= bindparam("created_at_end"))
+    if shape[3] is not None:
+        stmt = stmt.filter(_where_clause(shape[3]))
+    return stmt
+
+
+def _order_by(stmt, shape):
+    _, sort_field, sort_desc, _ = shape
+    column = getattr(Lead, sort_field)
+    return stmt.order_by(desc(column) if sort_desc else asc(column))
+
+
+def _build_page(shape):
+    stmt = _order_by(_where(select(Lead), shape), shape)
+    return stmt.offset(bindparam("skip")).limit(bindparam("limit"))
+
+
+def _build_count(shape):
+    return _where(select(func.count()).select_from(Lead), shape)
+
+
+def _build_stream(shape):
+    return _order_by(_where(select(Lead), shape), shape)
+
+
+def _build_page_facets(shape):
+    # One round trip for the page, the per-stage and per-engaged counts and the total:
+    # the page rows and the count rows are stacked with UNION ALL, told apart by `row_kind`.
+    # Page rows carry their `position` in the page (UNION ALL does not keep their order)
+    # and the lead columns; count rows carry `facet_value`/`engaged_value` and `count`.
+    page = _build_page(shape).subquery("page")
+    sort_column = page.c[shape[1]]
+    position = func.row_number().over(order_by=desc(sort_column) if shape[2] else asc(sort_column))
+    filtered = _where(select(Lead.stage, Lead.engaged), shape).cte("filtered_leads")
+    no_lead = [cast(null(), column.type).label(column.key) for column in Lead.__table__.columns]
+    return union_all(
+        select(
+            literal("item").label("row_kind"),
+            position.label("position"),
+            cast(null(), String).label("facet_value"),
+            cast(null(), Boolean).label("engaged_value"),
+            cast(null(), Integer).label("count"),
+            *[page.c[column.key] for column in Lead.__table__.columns],
+        ),
+        select(literal("stage"), null(), filtered.c.stage, cast(null(), Boolean), func.count(), *no_lead)
+        .group_by(filtered.c.stage),
+        select(literal("engaged"), null(), cast(null(), String), filtered.c.engaged, func.count(), *no_lead)
+        .group_by(filtered.c.engaged),
+        select(literal("total"), null(), cast(null(), String), cast(null(), Boolean), func.count(), *no_lead)
+        .select_from(filtered),
+    )
+
+
+class LeadStatementRegistry:
+    """
+    Builds each lead list statement once per (kind, shape) and hands out the cached object.
+
+    Reusing the same statement object skips rebuilding the query and recomputing its
+    cache key, and keeps the SQL text stable so SQLAlchemy's compiled cache and the
+    driver's prepared statement cache hit.
+    """
+    _builders = {
+        "page": _build_page,
+        "count": _build_count,
+        "stream": _build_stream,
+        "page_facets": _build_page_facets,
+    }
+
+    def __init__(self) -> None:
+        self._statements = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, shape):
+        key = (kind, shape)
+        stmt = self._statements.get(key)
+        if stmt is None:
+            self.misses += 1
+            stmt = self._builders[kind](shape)
+            self._statements[key] = stmt
+        else:
+            self.hits += 1
+        return stmt
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "shapes": len(self._statements),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+# Global instance of the LeadStatementRegistry
+lead_statements = LeadStatementRegistry()
+register_metrics("lead_statements", lead_statements.snapshot)
@@ -0,0 +1,111 @@
+# app/crud/lead_stats_crud.py
+from datetime import datetime, date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models.lead_stats import LeadDailyStat
+from app.core.logger import logger
+
+
+# Filters the summary table can answer; anything else (e.g. a `where` tree) is rejected.
+# The list's sort keys are accepted so dashboards can send one filter object; order
+# does not change the aggregates.
+STATS_FILTERS = frozenset({"stage", "engaged", "createdAtStart", "createdAtEnd", "sortField", "sortOrder"})
+
+# INSERT ... ON CONFLICT DO UPDATE, which both dialects spell the same way
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def lead_stats_key(lead) -> tuple:
+    """
+    Return the summary bucket (day, stage, engaged) a lead is counted in.
+    """
+    created_at = lead.created_at or datetime.utcnow()
+    return (created_at.date(), lead.stage or "", bool(lead.engaged))
+
+
+async def bump_lead_stats(db: AsyncSession, key: tuple, delta: int):
+    """
+    Add `delta` to the count of a summary bucket, creating the bucket if needed.
+    Runs inside the caller's transaction so the summary commits with the lead change.
+    """
+    day, stage, engaged = key
+    insert = _UPSERT_INSERTS[db.bind.dialect.name]
+    stmt = insert(LeadDailyStat).values(day=day, stage=stage, engaged=engaged, count=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LeadDailyStat.day, LeadDailyStat.stage, LeadDailyStat.engaged],
+        set_={"count": LeadDailyStat.count + stmt.excluded.count},
+    )
+    await db.execute(stmt)
+
+
+async def move_lead_stats(db: AsyncSession, old_key: tuple, new_key: tuple):
+    """
+    Move one lead from one summary bucket to another.
+    """
+    if old_key == new_key:
+        return
+    await bump_lead_stats(db, old_key, -1)
+    await bump_lead_stats(db, new_key, 1)
+
+
+async def get_lead_stats(db: AsyncSession, filters: dict = None):
+    """
+    Aggregate the summary table into pipeline statistics.
+
+    Supported filters: stage, engaged, createdAtStart, createdAtEnd (YYYY-MM-DD, inclusive).
+    Other filters raise ValueError rather than being ignored.
+    The cost depends on the number of days and stages in range, not on the number of leads.
+    """
+    stmt = select(
+        LeadDailyStat.day,
+        LeadDailyStat.stage,
+        LeadDailyStat.engaged,
+        func.sum(LeadDailyStat.count),
+    ).group_by(LeadDailyStat.day, LeadDailyStat.stage, LeadDailyStat.engaged)
+
+    filters = filters or {}
+    unsupported = set(filters) - STATS_FILTERS
+    if unsupported:
+        raise ValueError(f"Unsupported stats filters: {sorted(unsupported)}")
+    if filters.get("stage"):
+        stmt = stmt.filter(LeadDailyStat.stage == filters["stage"])
+    if filters.get("engaged"):
+        stmt = stmt.filter(LeadDailyStat.engaged == (str(filters["engaged"]).lower() == "true"))
+    if filters.get("createdAtStart"):
+        stmt = stmt.filter(LeadDailyStat.day >= _parse_day(filters["createdAtStart"]))
+    if filters.get("createdAtEnd"):
+        stmt = stmt.filter(LeadDailyStat.day <= _parse_day(filters["createdAtEnd"]))
+
+    rows = (await db.execute(stmt)).all()
+
+    total = 0
+    engaged = 0
+    by_stage = {}
+    per_day = {}
+    for day, stage, is_engaged, count in rows:
+        count = int(count or 0)
+        if not count:
+            continue
+        total += count
+        if is_engaged:
+            engaged += count
+        by_stage[stage] = by_stage.get(stage, 0) + count
+        per_day[day] = per_day.get(day, 0) + count
+
+    return {
+        "total": total,
+        "engaged": engaged,
+        "engaged_ratio": engaged / total if total else 0.0,
+        "by_stage": by_stage,
+        "created_per_day": [{"date": day, "count": per_day[day]} for day in sorted(per_day)],
+    }
+
+
+def _parse_day(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError) as e:
+        logger.info(f"Invalid stats date filter {value!r}: {e}")
+        raise ValueError(f"Invalid date: {value}")
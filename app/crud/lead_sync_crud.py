@@ -0,0 +1,128 @@
+# app/crud/lead_sync_crud.py
+import base64
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import delete, func, tuple_
+from app.models.lead import Lead
+from app.models.lead_deletion import LeadDeletion
+from app.core.config import LEAD_DELETION_RETENTION_DAYS, LEAD_SYNC_SAFETY_SECONDS
+from app.core.logger import logger
+
+
+class SyncCursorExpired(Exception):
+    """
+    The cursor is older than the tombstone retention; the client must do a full resync.
+    """
+
+
+def encode_sync_cursor(updated_at: datetime, lead_id: str, deletion_id: int) -> str:
+    payload = {
+        "u": updated_at.isoformat() if updated_at else None,
+        "i": lead_id,
+        "d": deletion_id,
+        "t": int(time.time()),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_sync_cursor(cursor: str) -> dict:
+    """
+    Decode a cursor returned by `get_lead_changes`. Raises ValueError if it is malformed
+    and SyncCursorExpired if tombstones it depends on may have been purged.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        decoded = {
+            "updated_at": datetime.fromisoformat(payload["u"]) if payload["u"] else None,
+            "lead_id": UUID(payload["i"]) if payload["i"] else None,
+            "deletion_id": int(payload["d"]),
+            "issued_at": int(payload["t"]),
+        }
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if decoded["issued_at"] < time.time() - LEAD_DELETION_RETENTION_DAYS * 86400:
+        raise SyncCursorExpired()
+    return decoded
+
+
+def sync_safe_point(db_now: datetime) -> datetime:
+    """
+    The latest updated_at a cursor may advance to, given the database's current time.
+    `updated_at` is a naive UTC column while PostgreSQL's now() is a timestamptz, so the
+    result is naive UTC either way.
+    """
+    if db_now.tzinfo is not None:
+        db_now = db_now.astimezone(timezone.utc).replace(tzinfo=None)
+    return db_now - timedelta(seconds=LEAD_SYNC_SAFETY_SECONDS)
+
+
+async def get_lead_changes(db: AsyncSession, since: str = None, limit: int = 500):
+    """
+    Return the leads created or updated after the cursor, the tombstones of leads deleted
+    after it, and the cursor to pass next time. Without a cursor, every lead is returned
+    (page by page) and the sync starts from the current end of the deletion log.
+    """
+    position = decode_sync_cursor(since) if since else None
+
+    stmt = select(Lead).order_by(Lead.updated_at, Lead.id).limit(limit + 1)
+    if position and position["updated_at"] is not None:
+        if position["lead_id"] is None:
+            # Cursor held at the safety point: resend everything from that instant on
+            stmt = stmt.filter(Lead.updated_at >= position["updated_at"])
+        else:
+            stmt = stmt.filter(tuple_(Lead.updated_at, Lead.id) > tuple_(position["updated_at"], position["lead_id"]))
+    leads = (await db.execute(stmt)).scalars().all()
+
+    if position:
+        deletion_stmt = (
+            select(LeadDeletion)
+            .filter(LeadDeletion.id > position["deletion_id"])
+            .order_by(LeadDeletion.id)
+            .limit(limit + 1)
+        )
+        deletions = (await db.execute(deletion_stmt)).scalars().all()
+        last_deletion_id = position["deletion_id"]
+    else:
+        deletions = []
+        last_deletion_id = (await db.execute(select(func.coalesce(func.max(LeadDeletion.id), 0)))).scalar_one()
+
+    has_more = len(leads) > limit or len(deletions) > limit
+    leads, deletions = leads[:limit], deletions[:limit]
+    if deletions:
+        last_deletion_id = deletions[-1].id
+
+    if leads:
+        updated_at, lead_id = leads[-1].updated_at, str(leads[-1].id)
+    elif position:
+        updated_at, lead_id = position["updated_at"], str(position["lead_id"]) if position["lead_id"] else None
+    else:
+        updated_at, lead_id = None, None
+
+    if not has_more and updated_at is not None:
+        # Hold the cursor behind transactions that may still commit with an older updated_at;
+        # rows in that window are sent again next time, which is harmless for an upsert-based sync.
+        safe_point = sync_safe_point((await db.execute(select(func.now()))).scalar_one())
+        if updated_at > safe_point:
+            updated_at, lead_id = safe_point, None
+
+    return {
+        "items": leads,
+        "deleted": [{"id": d.lead_id, "deleted_at": d.deleted_at} for d in deletions],
+        "cursor": encode_sync_cursor(updated_at, lead_id, last_deletion_id),
+        "has_more": has_more,
+    }
+
+
+async def purge_lead_deletions(db: AsyncSession, retention_days: int = LEAD_DELETION_RETENTION_DAYS) -> int:
+    """
+    Delete tombstones older than the retention period. Returns the number removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    result = await db.execute(delete(LeadDeletion).where(LeadDeletion.deleted_at < cutoff))
+    await db.commit()
+    logger.info(f"Purged {result.rowcount} lead tombstones older than {cutoff}")
+    return result.rowcount
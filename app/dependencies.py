@@ -1,9 +1,11 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Cookie, Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def verify_jwt_token(token: str):
     """Verify and decode the JWT token."""
@@ -20,3 +22,17 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     token = credentials.credentials
     user_data = verify_jwt_token(token)
     return user_data
+
+def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token_query: Optional[str] = Query(None, alias="access_token"),
+    access_token_cookie: Optional[str] = Cookie(None, alias="access_token"),
+):
+    """
+    Like get_current_user, but also accepts the token as the `access_token` query parameter
+    or cookie, since browser EventSource connections cannot send an Authorization header.
+    """
+    token = credentials.credentials if credentials else access_token_query or access_token_cookie
+    if not token:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authenticated")
+    return verify_jwt_token(token)
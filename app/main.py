@@ -1,28 +1,57 @@
 # app/main.py
+import time
+_import_started = time.perf_counter()
+
 import logging
 import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from fastapi.responses import JSONResponse
 from app.core.database import engine, Base
-from app.api.routes import lead, auth
+from app.api.routes import lead, auth, debug
 from app.websockets import manager
 from sqlalchemy.sql import text
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.logger import logger
-from app.middleware import ExceptionLoggingMiddleware, LoggingMiddleware
+from app.middleware import ExceptionLoggingMiddleware, LoggingMiddleware, CompressionMiddleware, AdmissionControlMiddleware, ProfilingMiddleware
+from app.core.metrics import collect_metrics
 from fastapi.middleware.cors import CORSMiddleware
+from app.warmup import startup_state, warm_up
+from app.maintenance import maintenance_loop
+from app.outbox import outbox_dispatcher
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Route uvicorn logs through our handlers and warm up the pool, hot queries,
+    bcrypt and the OpenAPI schema in the background; /ready reports when done.
+    Upcoming lead partitions are created and expired sync tombstones and export
+    jobs purged at startup and periodically. Lead events are delivered from the outbox.
+    """
+    uvicorn_logger = logging.getLogger("uvicorn")
+    uvicorn_logger.handlers = logger.handlers
+    uvicorn_logger.setLevel(logging.INFO)
+
+    warm_up_task = asyncio.create_task(warm_up(app))
+    maintenance_task = asyncio.create_task(maintenance_loop())
+    outbox_task = asyncio.create_task(outbox_dispatcher.run())
+    yield
+    warm_up_task.cancel()
+    maintenance_task.cancel()
+    outbox_task.cancel()
+    await manager.shutdown()
+    await engine.dispose()
 
-uvicorn_logger = logging.getLogger("uvicorn")
-uvicorn_logger.handlers = logger.handlers
-uvicorn_logger.setLevel(logging.INFO)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Lead Management",
     description="API for managing leads with CRUD operations, JWT authentication, CSV export, and real-time updates via WebSockets.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # app.add_middleware(LoggingMiddleware)
@@ -31,7 +60,17 @@ app = FastAPI(
 
 logger.info("FastAPI Application is starting...")
 
+# Compress HTTP responses (lists, exports); WebSocket traffic is passed through
+app.add_middleware(CompressionMiddleware)
+
+# Opt-in per-request profiling (signed X-Profile-Token header or PROFILE_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+
+# Bound concurrent reads, writes and exports so spikes are shed before they queue on the DB pool
+app.add_middleware(AdmissionControlMiddleware)
+
 # Configure CORS
+# Added last so it is the outermost middleware: shed 503s get CORS headers too
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify your frontend URL, e.g., ["https://myapp.com"]
@@ -49,15 +88,23 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(lead.router, prefix="/leads", tags=["Leads"])
+app.include_router(debug.router, prefix="/debug", tags=["Debug"])
+
+# Replies to the server's {"event": "ping"} heartbeats
+PONG_MESSAGES = {"pong", '{"event": "pong"}', '{"event":"pong"}'}
 
 # WebSocket endpoint for real-time updates
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, last_seq: Optional[int] = None, epoch: Optional[str] = None):
+    # Reconnecting clients pass ?last_seq=<seq>&epoch=<epoch> to receive only the events they missed
+    await manager.connect(websocket, last_seq=last_seq, epoch=epoch)
     try:
         while True:
             # Wait for a message from the client
             data = await websocket.receive_text()
+            # Any message (including a pong) keeps the connection alive; floods are dropped
+            if not manager.accept_message(websocket) or data in PONG_MESSAGES:
+                continue
             # Broadcast the update to all connected clients (e.g., notify on row update)
             await manager.broadcast(f"Real-time update: {data}")
     except WebSocketDisconnect:
@@ -69,6 +116,20 @@ def health_check():
     return {"status": "OK"}
 
 
+@app.get("/ready", tags=["Health Check"])
+def readiness_check():
+    """Readiness: 200 once the startup warm-up has finished, 503 before."""
+    if not startup_state.ready:
+        return JSONResponse(status_code=503, content={"status": "warming up", **startup_state.snapshot()})
+    return {"status": "ready", **startup_state.snapshot()}
+
+
+@app.get("/metrics", tags=["Health Check"])
+def metrics():
+    """Runtime metrics (compression ratios, CPU time, ...)."""
+    return collect_metrics()
+
+
 @app.get("/db-check", tags=["Health Check"])
 async def db_check(db: AsyncSession = Depends(get_db)):
     """Check database connectivity."""
@@ -78,4 +139,7 @@ async def db_check(db: AsyncSession = Depends(get_db)):
         return {"status": "success", "message": "Database is connected"}
     except Exception as e:
         logger.error(f"Database connection failed: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Database connection failed")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Database connection failed")
+
+
+startup_state.record("import", _import_started)
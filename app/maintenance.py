@@ -0,0 +1,33 @@
+# app/maintenance.py
+import asyncio
+from app.core.config import MAINTENANCE_INTERVAL_SECONDS
+from app.core.database import SessionLocal, engine
+from app.core.logger import logger
+from app.core.partitions import ensure_lead_partitions
+from app.crud.lead_sync_crud import purge_lead_deletions
+from app.services.export_jobs import export_jobs
+
+
+async def run_maintenance() -> None:
+    """
+    One maintenance pass: create upcoming lead partitions, drop expired lead tombstones
+    and expired export jobs.
+    """
+    async with engine.begin() as conn:
+        await ensure_lead_partitions(conn)
+    async with SessionLocal() as db:
+        await purge_lead_deletions(db)
+    export_jobs.sweep()
+
+
+async def maintenance_loop(interval: int = MAINTENANCE_INTERVAL_SECONDS) -> None:
+    """
+    Run `run_maintenance` at startup and then every `interval` seconds until cancelled.
+    Failures are logged and retried on the next pass.
+    """
+    while True:
+        try:
+            await run_maintenance()
+        except Exception as e:
+            logger.error(f"Maintenance pass failed: {e}", exc_info=True)
+        await asyncio.sleep(interval)
@@ -1,9 +1,40 @@
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from app.core.config import (
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_ZSTD_LEVEL,
+    ADMISSION_READ_LIMIT,
+    ADMISSION_WRITE_LIMIT,
+    ADMISSION_EXPORT_LIMIT,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_RETRY_AFTER,
+    PROFILE_SAMPLE_RATE,
+)
+from app.profiling import SamplingProfiler, RequestProfile, profile_store, current_profile, verify_profile_token
+from app.core.metrics import register_metrics
+import asyncio
+import json
+import random
+import threading
 import time
 import logging
 import traceback
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
 
 logger = logging.getLogger("api_logger")
 
@@ -31,3 +62,412 @@ class ExceptionLoggingMiddleware(BaseHTTPMiddleware):
                 status_code=500,
                 content={"detail": "An unexpected error occurred."},
             )
+
+
+class _GzipEncoder:
+    encoding = "gzip"
+
+    def __init__(self) -> None:
+        self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        # Sync-flush so every streamed chunk reaches the client without waiting for the next one
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class _BrotliEncoder:
+    encoding = "br"
+
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class _ZstdEncoder:
+    encoding = "zstd"
+
+    def __init__(self) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+# Supported encoders in server preference order; brotli and zstd only when installed
+_ENCODERS = {}
+if zstandard is not None:
+    _ENCODERS["zstd"] = _ZstdEncoder
+if brotli is not None:
+    _ENCODERS["br"] = _BrotliEncoder
+_ENCODERS["gzip"] = _GzipEncoder
+
+# Content types that are already compressed or must not be buffered by clients/proxies
+_UNCOMPRESSIBLE_TYPES = ("application/gzip", "application/zip", "image/", "video/", "audio/", "text/event-stream")
+
+
+class CompressionStats:
+    """
+    Counters for the compression middleware, exposed on /metrics.
+    """
+    def __init__(self) -> None:
+        self.encodings = {}
+        self.skipped = {"small": 0, "content_type": 0, "encoded": 0, "range": 0}
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+        stats = self.encodings.setdefault(encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0})
+        stats["responses"] += 1
+        stats["bytes_in"] += bytes_in
+        stats["bytes_out"] += bytes_out
+        stats["cpu_seconds"] += cpu_seconds
+
+    def snapshot(self) -> dict:
+        encodings = {}
+        for encoding, stats in self.encodings.items():
+            encodings[encoding] = {
+                **stats,
+                "ratio": stats["bytes_out"] / stats["bytes_in"] if stats["bytes_in"] else None,
+                "cpu_ms_per_mb": stats["cpu_seconds"] * 1000 / (stats["bytes_in"] / 1_000_000) if stats["bytes_in"] else None,
+            }
+        return {"encodings": encodings, "skipped": dict(self.skipped), "min_size": COMPRESSION_MIN_SIZE}
+
+
+compression_stats = CompressionStats()
+register_metrics("compression", compression_stats.snapshot)
+
+
+def _negotiate_encoding(accept_encoding: str):
+    """
+    Pick the encoder for an Accept-Encoding header: highest q-value wins,
+    ties go to the server preference order of `_ENCODERS`.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        token, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in _ENCODERS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return _ENCODERS.get(best)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI response compression (zstd, br or gzip, as negotiated).
+
+    Bodies below COMPRESSION_MIN_SIZE are sent as-is, streaming responses are compressed
+    chunk by chunk without buffering, and WebSocket connections are passed through untouched.
+    """
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        if "range" in request_headers:
+            compression_stats.skipped["range"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        # Without an acceptable encoding the responder only adds `Vary: Accept-Encoding`
+        encoder_class = _negotiate_encoding(request_headers.get("accept-encoding", ""))
+        responder = _CompressionResponder(send, encoder_class, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send, encoder_class, minimum_size: int) -> None:
+        self._send = send
+        self._encoder_class = encoder_class
+        self._minimum_size = minimum_size
+        self._start_message = None
+        self._encoder = None
+        self._passthrough = False
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._cpu_seconds = 0.0
+
+    async def send(self, message) -> None:
+        if message["type"] == "http.response.start":
+            self._start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if "content-encoding" in headers:
+                compression_stats.skipped["encoded"] += 1
+                self._passthrough = True
+            elif message["status"] in (204, 206, 304) or content_type.startswith(_UNCOMPRESSIBLE_TYPES):
+                compression_stats.skipped["content_type"] += 1
+                self._passthrough = True
+            else:
+                # The body depends on Accept-Encoding even when this one is sent as-is
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                self._passthrough = self._encoder_class is None
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self._passthrough:
+            if self._start_message is not None:
+                await self._send(self._start_message)
+                self._start_message = None
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._start_message is not None:
+            # First body chunk decides: a complete small body is sent uncompressed
+            if not more_body and len(body) < self._minimum_size:
+                compression_stats.skipped["small"] += 1
+                self._passthrough = True
+                await self._send(self._start_message)
+                self._start_message = None
+                await self._send(message)
+                return
+            self._encoder = self._encoder_class()
+            headers = MutableHeaders(raw=self._start_message["headers"])
+            headers["Content-Encoding"] = self._encoder.encoding
+            if "content-length" in headers:
+                del headers["Content-Length"]
+
+        started = time.thread_time()
+        data = self._encoder.compress(body) if more_body else self._encoder.finish(body)
+        self._cpu_seconds += time.thread_time() - started
+        self._bytes_in += len(body)
+        self._bytes_out += len(data)
+
+        if self._start_message is not None:
+            if not more_body:
+                MutableHeaders(raw=self._start_message["headers"])["Content-Length"] = str(len(data))
+            await self._send(self._start_message)
+            self._start_message = None
+        await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        if not more_body:
+            compression_stats.record(self._encoder.encoding, self._bytes_in, self._bytes_out, self._cpu_seconds)
+
+
+class AdmissionClass:
+    """
+    Concurrency limit for one class of routes: at most `limit` requests run at once,
+    up to `max_queue` more wait up to `queue_timeout` seconds for a slot, the rest are shed.
+    """
+    def __init__(self, name: str, limit: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT, max_queue: int = ADMISSION_MAX_QUEUE) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "timeout": 0}
+        self.wait_seconds = 0.0
+
+    async def acquire(self) -> bool:
+        """
+        Wait for a slot. Returns False if the request must be shed.
+        """
+        if self._slots.locked():
+            if self.queued >= self.max_queue:
+                self.shed["queue_full"] += 1
+                return False
+        started = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed["timeout"] += 1
+            return False
+        finally:
+            self.queued -= 1
+            self.wait_seconds += time.perf_counter() - started
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "avg_wait_ms": self.wait_seconds * 1000 / (self.admitted + sum(self.shed.values()) or 1),
+        }
+
+
+# Endpoints that do not touch the database or hold a connection open indefinitely
+# Long-lived event streams would hold a read slot for as long as they are open
+ADMISSION_EXEMPT_PATHS = ("/health", "/ready", "/metrics", "/docs", "/redoc", "/openapi.json", "/leads/events")
+EXPORT_PATHS = ("/leads/export-leads",)
+# Export job files are long transfers too; polling a job's status stays a read
+EXPORT_DOWNLOAD_PREFIX = "/leads/export-jobs/"
+EXPORT_DOWNLOAD_SUFFIX = "/download"
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# Lookups that take their input as a POST body
+READ_POST_PATHS = ("/leads/batch-get",)
+
+admission_classes = {
+    "read": AdmissionClass("read", ADMISSION_READ_LIMIT),
+    "write": AdmissionClass("write", ADMISSION_WRITE_LIMIT),
+    "export": AdmissionClass("export", ADMISSION_EXPORT_LIMIT),
+}
+register_metrics("admission", lambda: {name: c.snapshot() for name, c in admission_classes.items()})
+
+
+def classify_request(method: str, path: str):
+    """
+    Route class of a request ("read", "write" or "export"), or None if it is not limited.
+    """
+    if path in ADMISSION_EXEMPT_PATHS:
+        return None
+    if path.startswith(EXPORT_PATHS):
+        return "export"
+    if path.startswith(EXPORT_DOWNLOAD_PREFIX) and path.endswith(EXPORT_DOWNLOAD_SUFFIX):
+        return "export"
+    if method in READ_METHODS or path in READ_POST_PATHS:
+        return "read"
+    return "write"
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI admission control in front of the routes that use the DB pool.
+
+    Interactive reads, writes and exports each have their own concurrency limit, so a
+    burst of exports cannot take every pool connection from the dashboard. A request that
+    cannot get a slot within the queue timeout (or finds the queue full) is answered at once
+    with 503 and Retry-After instead of waiting on the pool. A streaming export keeps its
+    slot until the response is fully sent. WebSocket connections are not limited.
+    """
+    def __init__(self, app, classes: dict = None, retry_after: int = ADMISSION_RETRY_AFTER) -> None:
+        self.app = app
+        self.classes = classes if classes is not None else admission_classes
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = classify_request(scope["method"], scope["path"])
+        admission = self.classes.get(name)
+        if admission is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await admission.acquire():
+            logger.warning(f"Shedding {scope['method']} {scope['path']}: {name} limit reached")
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+    async def _reject(self, send) -> None:
+        body = json.dumps({"detail": "Server busy, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Never profiled: health checks and the profile endpoints themselves
+PROFILE_EXEMPT_PREFIXES = ("/health", "/ready", "/metrics", "/debug", "/leads/events")
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI opt-in request profiling.
+
+    A request is profiled when it carries a valid X-Profile-Token header or is picked by
+    PROFILE_SAMPLE_RATE. Its stack is sampled while it runs, database time is measured
+    through the engine events, and the result is kept in `profile_store`; the response
+    carries its ID in X-Profile-Id. Other requests only pay for the header lookup.
+    """
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(PROFILE_EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        reason = self._reason(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], reason)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Profile-Id", profile.id)
+            await send(message)
+
+        profiler = SamplingProfiler(threading.get_ident())
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            profile.wall_seconds = time.perf_counter() - started
+            profile.samples = profiler.samples
+            current_profile.reset(token)
+            profile_store.add(profile)
+            logger.info(f"Profiled {profile.method} {profile.path}: {profile.summary()}")
+
+    def _reason(self, scope):
+        for name, value in scope["headers"]:
+            if name == b"x-profile-token":
+                return "token" if verify_profile_token(value.decode("latin-1")) else None
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
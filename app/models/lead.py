@@ -1,24 +1,48 @@
 # app/models/lead.py
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, func
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, Uuid, func
 from datetime import datetime
 from uuid import uuid4
-from sqlalchemy.dialects.postgresql import UUID
 from app.core.database import Base
 
 class Lead(Base):
     """
     SQLAlchemy model for the 'leads' table.
+
+    On PostgreSQL the migrated table is range partitioned by month of created_at, with
+    (id, created_at) as primary key and email uniqueness enforced through the lead_emails
+    registry (see app/core/partitions.py). Queries are unaffected, so the model keeps the
+    plain layout, which is also what create_all builds for tests.
+
+    Like the migration, the model indexes email without a unique constraint (a partitioned
+    table cannot have one); only the SQLite schema built by create_all gets a unique index.
     """
     __tablename__ = "leads"
+    __table_args__ = (
+        Index("ix_leads_updated_at_id", "updated_at", "id"),  # keyset scans for /leads/changes
+        Index("ix_leads_created_at", "created_at"),  # default list order and date filters
+        # Further list sort/filter columns (see FILTER_FIELDS in app/crud/lead_query.py)
+        Index("ix_leads_stage", "stage"),
+        Index("ix_leads_name", "name"),
+        Index("ix_leads_company", "company"),
+        Index("ix_leads_email", "email"),
+        # `prefix` filters (LIKE 'abc%'), which the indexes above cannot serve under a non-C collation
+        *(
+            Index(f"ix_leads_{column}_pattern", column, postgresql_ops={column: "varchar_pattern_ops"})
+            .ddl_if(dialect="postgresql")
+            for column in ("name", "email", "company", "stage")
+        ),
+        # On PostgreSQL the lead_emails registry keeps emails unique; excluded from autogenerate in alembic/env.py
+        Index("uq_leads_email", "email", unique=True, info={"sqlite_only": True}).ddl_if(dialect="sqlite"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, unique=True, nullable=False)  # Unique identifier for the lead
+    id = Column(Uuid, primary_key=True, default=uuid4, unique=True, nullable=False)  # Unique identifier for the lead
     name = Column(String, nullable=False)
-    email = Column(String, unique=True, index=True, nullable=False)  # Email address (unique)
+    email = Column(String, nullable=False)  # Email address (unique, see above)
     company = Column(String, nullable=True)
     phone = Column(String, nullable=True)
     stage = Column(String, default="New")
     engaged = Column(Boolean, default=False)
     last_contacted = Column(DateTime, nullable=True)
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # partition key
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
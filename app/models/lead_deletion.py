@@ -0,0 +1,18 @@
+# app/models/lead_deletion.py
+from sqlalchemy import Column, BigInteger, Integer, DateTime, Uuid
+from datetime import datetime
+from app.core.database import Base
+
+class LeadDeletion(Base):
+    """
+    SQLAlchemy model for the 'lead_deletions' log.
+
+    One tombstone per deleted lead so delta-sync clients learn about deletes.
+    Tombstones older than the retention period are purged.
+    """
+    __tablename__ = "lead_deletions"
+
+    # SQLite only autoincrements INTEGER primary keys
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    lead_id = Column(Uuid, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
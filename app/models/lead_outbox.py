@@ -0,0 +1,18 @@
+# app/models/lead_outbox.py
+from sqlalchemy import Column, BigInteger, Integer, DateTime, Text
+from datetime import datetime
+from app.core.database import Base
+
+class LeadOutboxEvent(Base):
+    """
+    SQLAlchemy model for the 'lead_outbox' table.
+
+    Lead events are written here in the same transaction as the change and removed
+    once the dispatcher (app/outbox.py) has delivered them.
+    """
+    __tablename__ = "lead_outbox"
+
+    # SQLite only autoincrements INTEGER primary keys
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    payload = Column(Text, nullable=False)  # JSON-encoded event
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
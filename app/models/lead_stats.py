@@ -0,0 +1,17 @@
+# app/models/lead_stats.py
+from sqlalchemy import Column, Integer, String, Date, Boolean
+from app.core.database import Base
+
+class LeadDailyStat(Base):
+    """
+    SQLAlchemy model for the 'lead_daily_stats' summary table.
+
+    One row per (creation day, stage, engaged) bucket holding the number of leads
+    in that bucket. Rows are maintained incrementally by the lead CRUD paths.
+    """
+    __tablename__ = "lead_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    stage = Column(String, primary_key=True, default="")  # "" when the lead has no stage
+    engaged = Column(Boolean, primary_key=True, default=False)
+    count = Column(Integer, nullable=False, default=0)
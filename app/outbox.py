@@ -0,0 +1,101 @@
+# app/outbox.py
+import asyncio
+import json
+from datetime import datetime
+from typing import Awaitable, Callable, List
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.config import OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL
+from app.core.database import SessionLocal
+from app.core.logger import logger
+from app.core.metrics import register_metrics
+from app.models.lead_outbox import LeadOutboxEvent
+from app.websockets import manager
+
+
+def enqueue_lead_event(db: AsyncSession, event: dict) -> None:
+    """
+    Add a lead event to the outbox in the caller's transaction; it is delivered once
+    that transaction commits. Call `outbox_dispatcher.notify()` after the commit.
+    """
+    db.add(LeadOutboxEvent(payload=json.dumps(event, default=str)))
+
+
+class OutboxDispatcher:
+    """
+    Delivers outbox events, in order, to the registered consumers (the WebSocket manager
+    by default) and deletes them in batches afterwards.
+
+    Delivery is at least once: if the process stops after delivering a batch but before
+    deleting it, the batch is delivered again. Each event carries its outbox `event_id`
+    so consumers can drop duplicates. Rows are claimed with FOR UPDATE SKIP LOCKED on
+    PostgreSQL, so several dispatchers never deliver the same batch concurrently.
+    """
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE, poll_interval: float = OUTBOX_POLL_INTERVAL) -> None:
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.consumers: List[Callable[[dict], Awaitable]] = [manager.publish]
+        self._wakeup = asyncio.Event()
+        self.stats = {"delivered": 0, "batches": 0, "errors": 0, "last_lag_ms": None}
+
+    def add_consumer(self, consumer: Callable[[dict], Awaitable]) -> None:
+        self.consumers.append(consumer)
+
+    def notify(self) -> None:
+        """
+        Wake the dispatcher after committing new events, instead of waiting for the next poll.
+        """
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        """
+        Deliver events until cancelled: whenever notified, and every `poll_interval`
+        seconds to pick up events left by a failed or interrupted delivery.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.dispatch_batch() == self.batch_size:
+                    pass
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Outbox delivery failed: {e}", exc_info=True)
+
+    async def dispatch_batch(self) -> int:
+        """
+        Deliver and delete the oldest batch of events. Returns how many were delivered.
+        """
+        async with SessionLocal() as db:
+            stmt = (
+                select(LeadOutboxEvent)
+                .order_by(LeadOutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = (await db.execute(stmt)).scalars().all()
+            if not events:
+                return 0
+            for event in events:
+                message = {**json.loads(event.payload), "event_id": event.id}
+                for consumer in self.consumers:
+                    await consumer(message)
+            await db.execute(delete(LeadOutboxEvent).where(LeadOutboxEvent.id.in_([event.id for event in events])))
+            await db.commit()
+
+        self.stats["delivered"] += len(events)
+        self.stats["batches"] += 1
+        self.stats["last_lag_ms"] = round((datetime.utcnow() - events[-1].created_at).total_seconds() * 1000, 3)
+        return len(events)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "consumers": len(self.consumers)}
+
+
+# Global instance of the OutboxDispatcher
+outbox_dispatcher = OutboxDispatcher()
+register_metrics("outbox", outbox_dispatcher.snapshot)
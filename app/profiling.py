@@ -0,0 +1,204 @@
+# app/profiling.py
+import argparse
+import hashlib
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app.core.config import PROFILE_SECRET, PROFILE_SAMPLE_INTERVAL, PROFILE_STORE_SIZE
+from app.core.database import engine
+from app.core.metrics import register_metrics
+
+# Profile of the request being handled, None when it is not profiled
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+def sign_profile_token(ttl_seconds: int = 3600, secret: str = None) -> str:
+    """
+    Create an X-Profile-Token value valid for `ttl_seconds`.
+    """
+    secret = secret or PROFILE_SECRET
+    expires = str(int(time.time()) + ttl_seconds)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def verify_profile_token(token: Optional[str], secret: str = None) -> bool:
+    """
+    Check an X-Profile-Token value. Always False when no PROFILE_SECRET is configured.
+    """
+    secret = secret or PROFILE_SECRET
+    if not secret or not token or "." not in token:
+        return False
+    expires, signature = token.split(".", 1)
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected) and expires.isdigit() and int(expires) > time.time()
+
+
+class SamplingProfiler:
+    """
+    Samples the call stack of one thread (the event loop's) every `interval` seconds
+    from a background thread. Anything running on the loop meanwhile is sampled too,
+    including other requests handled concurrently.
+    """
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+
+class RequestProfile:
+    """
+    Timings and stack samples of one profiled request.
+    Wall time is split into time spent in database calls and the rest (Python).
+    """
+    def __init__(self, method: str, path: str, reason: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.wall_seconds = 0.0
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.samples = Counter()
+        self.sample_interval = PROFILE_SAMPLE_INTERVAL
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "status": self.status,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall_seconds * 1000, 3),
+            "db_ms": round(self.db_seconds * 1000, 3),
+            "python_ms": round(max(self.wall_seconds - self.db_seconds, 0) * 1000, 3),
+            "statements": self.statements,
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self) -> str:
+        """
+        Stacks in the collapsed format read by flamegraph.pl and speedscope.
+        """
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = ";".join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> dict:
+        """
+        The samples as a speedscope "sampled" profile.
+        """
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    name, filename, line = frame
+                    frames.append({"name": name, "file": filename, "line": line})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(count * self.sample_interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "artisan-backend",
+            "name": f"{self.method} {self.path}",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{self.method} {self.path}",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.wall_seconds,
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class ProfileStore:
+    """
+    Keeps the last `size` request profiles.
+    """
+    def __init__(self, size: int = PROFILE_STORE_SIZE) -> None:
+        self.size = size
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self.profiled = 0
+
+    def add(self, profile: RequestProfile) -> None:
+        self.profiled += 1
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.size:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list:
+        return [profile.summary() for profile in reversed(self._profiles.values())]
+
+    def snapshot(self) -> dict:
+        return {"profiled": self.profiled, "stored": len(self._profiles), "capacity": self.size}
+
+
+# Global instance of the ProfileStore
+profile_store = ProfileStore()
+register_metrics("profiling", profile_store.snapshot)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_db_timer(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _stop_db_timer(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None and hasattr(context, "_profile_started"):
+        profile.db_seconds += time.perf_counter() - context._profile_started
+        profile.statements += 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Request profiling helpers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sign = commands.add_parser("sign", help="print an X-Profile-Token value")
+    sign.add_argument("--ttl", type=int, default=3600, help="validity in seconds")
+    args = parser.parse_args()
+    if not PROFILE_SECRET:
+        parser.error("PROFILE_SECRET is not set")
+    print(sign_profile_token(args.ttl))
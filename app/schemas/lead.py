@@ -1,8 +1,9 @@
 # app/schemas/lead.py
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from datetime import datetime, date
 from uuid import UUID
-from typing import Optional
+from typing import Any, Literal, Optional, Dict, List, Union
+from app.core.config import LEAD_BATCH_GET_MAX_IDS
 
 class LeadBase(BaseModel):
     """
@@ -45,4 +46,117 @@ class LeadResponse(LeadBase):
     id: UUID
 
     class Config:
-        from_attributes = True  # Convert attribute names to snake_case for JSON responses
\ No newline at end of file
+        from_attributes = True  # Convert attribute names to snake_case for JSON responses
+
+class LeadStatsDay(BaseModel):
+    """
+    Number of leads created on a given day.
+    """
+    date: date
+    count: int
+
+class LeadStatsResponse(BaseModel):
+    """
+    Schema for the lead pipeline statistics.
+    """
+    total: int
+    engaged: int
+    engaged_ratio: float
+    by_stage: Dict[str, int]
+    created_per_day: List[LeadStatsDay]
+
+class ExportJobResponse(BaseModel):
+    """
+    Schema for the status of a background export job.
+    """
+    id: str
+    status: str                           # pending, running, completed or failed
+    format: str
+    compress: bool
+    rows_written: int
+    total_rows: Optional[int] = None
+    progress: Optional[float] = None      # 0.0 - 1.0 once the total is known
+    bytes_written: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    download_url: Optional[str] = None
+
+class LeadTombstone(BaseModel):
+    """
+    A lead deleted since the sync cursor.
+    """
+    id: UUID
+    deleted_at: datetime
+
+class LeadChangesResponse(BaseModel):
+    """
+    Schema for a delta-sync page: changed leads, deleted leads and the next cursor.
+    """
+    items: List[LeadResponse]
+    deleted: List[LeadTombstone]
+    cursor: str
+    has_more: bool
+
+class LeadBatchGetRequest(BaseModel):
+    """
+    Schema for looking up many leads by ID in one request.
+    """
+    ids: List[UUID] = Field(..., min_length=1, max_length=LEAD_BATCH_GET_MAX_IDS)
+
+class LeadBatchGetResponse(BaseModel):
+    """
+    Schema for a batch lookup: one entry per requested ID, in request order,
+    null where the lead does not exist, plus the list of IDs not found.
+    """
+    items: List[Optional[LeadResponse]]
+    missing: List[UUID]
+
+class LeadBulkUpdate(BaseModel):
+    """
+    Schema for updating every lead matching a filter.
+    Only fields that make sense for many leads at once; all are optional.
+    """
+    company: Optional[str] = None
+    stage: Optional[str] = None
+    engaged: Optional[bool] = None
+    last_contacted: Optional[datetime] = None
+
+class LeadBulkResult(BaseModel):
+    """
+    Schema for the outcome of a bulk update or delete.
+    """
+    affected: int
+    chunks: int
+
+class LeadFilterCondition(BaseModel):
+    """
+    One predicate of the lead list `where` filter: `field` compared with `value` by `op`.
+    `eq` takes a value, `in` a list, `prefix` a string and `range` an object with
+    `gte` and/or `lt` bounds.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    field: str
+    op: Literal["eq", "in", "prefix", "range"]
+    value: Any
+
+class LeadFilterAnd(BaseModel):
+    """
+    Matches leads matching every one of its nodes.
+    """
+    model_config = ConfigDict(extra="forbid", populate_by_name=True)
+
+    all_of: List["LeadFilterNode"] = Field(..., alias="and", min_length=1)
+
+class LeadFilterOr(BaseModel):
+    """
+    Matches leads matching any of its nodes.
+    """
+    model_config = ConfigDict(extra="forbid", populate_by_name=True)
+
+    any_of: List["LeadFilterNode"] = Field(..., alias="or", min_length=1)
+
+LeadFilterNode = Union[LeadFilterCondition, LeadFilterAnd, LeadFilterOr]
+LeadFilterAnd.model_rebuild()
+LeadFilterOr.model_rebuild()
@@ -0,0 +1,196 @@
+# app/services/export_jobs.py
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Dict, Optional
+from app.core.config import EXPORT_DIR, EXPORT_JOB_TTL_SECONDS, EXPORT_JOB_CONCURRENCY
+from app.core.database import SessionLocal
+from app.core.logger import logger
+from app.crud.lead_crud import count_leads, stream_leads
+from app.services.export_service import serialize_leads, export_filename, export_media_type
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class ExportJob:
+    """
+    State of one background export: its parameters, progress and on-disk artifact.
+    """
+    def __init__(
+        self,
+        key: str,
+        search: str,
+        filters: dict,
+        export_format: str,
+        compress: bool,
+        export_dir: str = EXPORT_DIR,
+        owner=None,
+    ) -> None:
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.owner = owner  # ID of the user who requested the export
+        self.search = search
+        self.filters = filters
+        self.export_format = export_format
+        self.compress = compress
+        self.status = PENDING
+        self.rows_written = 0
+        self.total_rows: Optional[int] = None
+        self.bytes_written = 0
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.path = os.path.join(export_dir, f"{self.id}-{export_filename(export_format, compress)}")
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def filename(self) -> str:
+        return export_filename(self.export_format, self.compress)
+
+    @property
+    def media_type(self) -> str:
+        return export_media_type(self.export_format, self.compress)
+
+    @property
+    def completed(self) -> bool:
+        return self.status == COMPLETED
+
+    @property
+    def active(self) -> bool:
+        return self.status in (PENDING, RUNNING)
+
+
+class ExportJobManager:
+    """
+    Runs lead exports in background tasks that write the file to local disk in chunks.
+
+    Jobs belong to the user who requested them: only identical requests of the same
+    user made while a job is pending or running share that job, and
+    finished jobs (and their files) are removed once they are older than the TTL.
+    Jobs only live in memory, so files in `export_dir` that belong to no known job
+    (left by a previous process) are removed once they are older than the TTL too.
+    """
+    def __init__(
+        self,
+        ttl_seconds: int = EXPORT_JOB_TTL_SECONDS,
+        concurrency: int = EXPORT_JOB_CONCURRENCY,
+        export_dir: str = EXPORT_DIR,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.export_dir = export_dir
+        self.jobs: Dict[str, ExportJob] = {}
+        self._active_by_key: Dict[str, ExportJob] = {}
+        self._slots = asyncio.Semaphore(concurrency)
+
+    @staticmethod
+    def job_key(search: str, filters: dict, export_format: str, compress: bool, owner=None) -> str:
+        """
+        Key identifying identical export requests of one user.
+        """
+        normalized = json.dumps([owner, search or None, filters or {}, export_format, compress], sort_keys=True, default=str)
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def submit(
+        self,
+        search: str = None,
+        filters: dict = None,
+        export_format: str = "csv",
+        compress: bool = False,
+        owner=None,
+    ) -> ExportJob:
+        """
+        Start an export job for `owner`, or return their running job for an identical request.
+        """
+        self.sweep()
+        key = self.job_key(search, filters, export_format, compress, owner)
+        job = self._active_by_key.get(key)
+        if job is not None:
+            logger.info(f"Joining running export job {job.id}")
+            return job
+
+        job = ExportJob(key, search, filters or {}, export_format, compress, self.export_dir, owner)
+        self.jobs[job.id] = job
+        self._active_by_key[key] = job
+        job.task = asyncio.create_task(self._run(job))
+        logger.info(f"Created export job {job.id}: format={export_format}, compress={compress}")
+        return job
+
+    def get(self, job_id: str, owner) -> Optional[ExportJob]:
+        """
+        Return a job of `owner` by ID, or None if it is unknown, expired or someone else's.
+        """
+        self.sweep()
+        job = self.jobs.get(job_id)
+        if job is None or job.owner != owner:
+            return None
+        return job
+
+    def sweep(self) -> None:
+        """
+        Remove finished jobs older than the TTL together with their files, and
+        unknown files in the export directory older than the TTL.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        for job in list(self.jobs.values()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self.jobs[job.id]
+                self._remove_file(job.path)
+                logger.info(f"Expired export job {job.id}")
+
+        known = {job.path for job in self.jobs.values()} | {f"{job.path}.part" for job in self.jobs.values()}
+        try:
+            entries = list(os.scandir(self.export_dir))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_file() and entry.path not in known and entry.stat().st_mtime < cutoff:
+                self._remove_file(entry.path)
+                logger.info(f"Removed orphaned export file {entry.name}")
+
+    async def _run(self, job: ExportJob) -> None:
+        async with self._slots:
+            job.status = RUNNING
+            partial_path = f"{job.path}.part"
+            try:
+                os.makedirs(self.export_dir, exist_ok=True)
+                async with SessionLocal() as db:
+                    job.total_rows = await count_leads(db, job.search, job.filters)
+                    leads = self._count_rows(job, stream_leads(db, job.search, job.filters))
+                    with open(partial_path, "wb") as f:
+                        async for chunk in serialize_leads(leads, job.export_format, job.compress):
+                            await asyncio.to_thread(f.write, chunk)
+                            job.bytes_written += len(chunk)
+                os.replace(partial_path, job.path)
+                job.status = COMPLETED
+                logger.info(f"Export job {job.id} completed: {job.rows_written} rows, {job.bytes_written} bytes")
+            except Exception as e:
+                job.status = FAILED
+                job.error = "Export failed"
+                self._remove_file(partial_path)
+                logger.error(f"Export job {job.id} failed: {e}", exc_info=True)
+            finally:
+                job.finished_at = time.time()
+                self._active_by_key.pop(job.key, None)
+
+    @staticmethod
+    async def _count_rows(job: ExportJob, leads):
+        async for lead in leads:
+            job.rows_written += 1
+            yield lead
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# Global instance of the ExportJobManager
+export_jobs = ExportJobManager()
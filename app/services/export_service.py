@@ -0,0 +1,112 @@
+# app/services/export_service.py
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+from app.core.database import SessionLocal
+from app.core.logger import logger
+from app.crud.lead_crud import stream_leads
+
+# Export format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+CSV_HEADER = ["ID", "Name", "Company", "Email", "Phone", "Stage", "Engaged", "Last Contacted", "Created At"]
+
+# Number of leads serialized into one chunk of the response body
+EXPORT_CHUNK_ROWS = 500
+
+
+def export_filename(export_format: str, compress: bool = False) -> str:
+    """
+    Return the attachment filename for an export.
+    """
+    filename = f"leads.{EXPORT_FORMATS[export_format][1]}"
+    return f"{filename}.gz" if compress else filename
+
+
+def export_media_type(export_format: str, compress: bool = False) -> str:
+    """
+    Return the media type of an export.
+    """
+    return "application/gzip" if compress else EXPORT_FORMATS[export_format][0]
+
+
+async def _csv_chunks(leads: AsyncIterator) -> AsyncIterator[bytes]:
+    stream = io.StringIO()
+    writer = csv.writer(stream)
+    writer.writerow(CSV_HEADER)
+    rows = 0
+    async for lead in leads:
+        writer.writerow([
+            lead.id, lead.name, lead.company, lead.email,
+            lead.phone, lead.stage, lead.engaged,
+            lead.last_contacted, lead.created_at
+        ])
+        rows += 1
+        if rows % EXPORT_CHUNK_ROWS == 0:
+            yield stream.getvalue().encode()
+            stream.seek(0)
+            stream.truncate()
+    yield stream.getvalue().encode()
+
+
+async def _ndjson_chunks(leads: AsyncIterator) -> AsyncIterator[bytes]:
+    lines = []
+    async for lead in leads:
+        lines.append(json.dumps({
+            "id": str(lead.id),
+            "name": lead.name,
+            "company": lead.company,
+            "email": lead.email,
+            "phone": lead.phone,
+            "stage": lead.stage,
+            "engaged": lead.engaged,
+            "last_contacted": lead.last_contacted.isoformat() if lead.last_contacted else None,
+            "created_at": lead.created_at.isoformat() if lead.created_at else None,
+        }))
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def _gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def serialize_leads(leads: AsyncIterator, export_format: str, compress: bool = False) -> AsyncIterator[bytes]:
+    """
+    Serialize a stream of leads into CSV or NDJSON byte chunks, gzip-compressed if requested.
+    """
+    chunks = _csv_chunks(leads) if export_format == "csv" else _ndjson_chunks(leads)
+    return _gzip_chunks(chunks) if compress else chunks
+
+
+async def export_leads_service(
+    search: str = None,
+    filters: dict = None,
+    export_format: str = "csv",
+    compress: bool = False
+) -> AsyncIterator[bytes]:
+    """
+    Stream the leads matching the list search/filters/sort as CSV or NDJSON.
+
+    The stream uses its own session because it outlives the request dependencies.
+    """
+    async with SessionLocal() as db:
+        try:
+            async for chunk in serialize_leads(stream_leads(db, search, filters), export_format, compress):
+                yield chunk
+        except Exception as e:
+            logger.error(f"Error while streaming lead export: {e}", exc_info=True)
+            raise
@@ -5,25 +5,34 @@ from app.crud.lead_crud import (
     create_lead,
     get_leads,
     get_lead,
+    get_leads_by_ids,
     update_lead,
     delete_lead,
-    get_all_leads
 )
-from app.schemas.lead import LeadCreate, LeadUpdate
+from app.crud.lead_bulk_crud import bulk_update_leads, bulk_delete_leads
+from app.crud.lead_stats_crud import get_lead_stats
+from app.crud.lead_sync_crud import get_lead_changes
+from app.crud.lead_query import normalize_lead_query
+from app.core.config import QUERY_TIMEOUT_LIST, QUERY_TIMEOUT_STATS, QUERY_TIMEOUT_SYNC, QUERY_TIMEOUT_BATCH_GET
+from app.core.database import SessionLocal
+from app.core.deadline import query_deadline
+from app.core.metrics import register_metrics
+from app.core.singleflight import SingleFlight
+from app.schemas.lead import LeadCreate, LeadUpdate, LeadBulkUpdate
 
-
-async def export_leads_service(db: AsyncSession):
-    """
-    Retrieve all leads for CSV export.
-    """
-    return await get_all_leads(db)
+# Identical concurrent list requests (e.g. every dashboard refetching after a broadcast)
+# share one execution; writes invalidate it so later requests see their own changes
+lead_list_flights = SingleFlight()
+register_metrics("lead_list_single_flight", lead_list_flights.snapshot)
 
 
 async def add_lead_service(db: AsyncSession, lead_data: LeadCreate, current_user: dict):
     """
     Add a new lead.
     """
-    return await create_lead(db, lead_data, current_user)
+    new_lead = await create_lead(db, lead_data, current_user)
+    lead_list_flights.invalidate()
+    return new_lead
 
 
 async def fetch_leads_service(
@@ -33,12 +42,25 @@ async def fetch_leads_service(
     search: str = None,
     sort_by: str = "id",
     sort_order: str = "asc",
-    filters: dict = None
+    filters: dict = None,
+    facets: bool = False
 ):
     """
     Retrieve leads with pagination, filtering, and sorting.
+    With `facets`, also return per-stage and per-engaged counts of the filtered set.
+
+    Concurrent requests with the same normalized parameters share one query, run on
+    its own session so it outlives any single caller, within QUERY_TIMEOUT_LIST.
     """
-    return await get_leads(db, skip, limit, search, sort_by, sort_order, filters)
+    shape, params = normalize_lead_query(search, filters)
+    key = (shape, tuple(sorted(params.items())), skip, limit, facets)
+
+    async def run():
+        async with SessionLocal() as session:
+            async with query_deadline(session, QUERY_TIMEOUT_LIST):
+                return await get_leads(session, skip, limit, search, sort_by, sort_order, filters, facets)
+
+    return await lead_list_flights.do(key, run)
 
 
 async def fetch_lead_service(db: AsyncSession, lead_id: UUID):
@@ -48,14 +70,68 @@ async def fetch_lead_service(db: AsyncSession, lead_id: UUID):
     return await get_lead(db, lead_id)
 
 
+async def fetch_leads_by_ids_service(db: AsyncSession, lead_ids: list):
+    """
+    Retrieve many leads by ID, in request order, with None for IDs that do not exist.
+    """
+    async with query_deadline(db, QUERY_TIMEOUT_BATCH_GET):
+        found = await get_leads_by_ids(db, lead_ids)
+    items = [found.get(lead_id) for lead_id in lead_ids]
+    missing = [lead_id for lead_id in dict.fromkeys(lead_ids) if lead_id not in found]
+    return {"items": items, "missing": missing}
+
+
 async def modify_lead_service(db: AsyncSession, lead_id: UUID, lead_data: LeadUpdate, current_user: dict):
     """
     Update an existing lead.
     """
-    return await update_lead(db, lead_id, lead_data, current_user)
+    lead = await update_lead(db, lead_id, lead_data, current_user)
+    lead_list_flights.invalidate()
+    return lead
 
 async def remove_lead_service(db: AsyncSession, lead_id: UUID, current_user: dict):
     """
     Delete a lead.
     """
-    return await delete_lead(db, lead_id, current_user)
\ No newline at end of file
+    deleted = await delete_lead(db, lead_id, current_user)
+    lead_list_flights.invalidate()
+    return deleted
+
+
+async def bulk_modify_leads_service(
+    db: AsyncSession,
+    search: str,
+    filters: dict,
+    lead_data: LeadBulkUpdate,
+    current_user: dict
+):
+    """
+    Update every lead matching the search/filters, in chunked transactions.
+    """
+    values = lead_data.model_dump(exclude_unset=True)
+    if not values:
+        raise ValueError("No fields to update")
+    return await bulk_update_leads(db, search, filters, values, current_user, on_commit=lead_list_flights.invalidate)
+
+
+async def bulk_remove_leads_service(db: AsyncSession, search: str, filters: dict, current_user: dict):
+    """
+    Delete every lead matching the search/filters, in chunked transactions.
+    """
+    return await bulk_delete_leads(db, search, filters, current_user, on_commit=lead_list_flights.invalidate)
+
+
+async def fetch_lead_stats_service(db: AsyncSession, filters: dict = None):
+    """
+    Retrieve pipeline statistics from the lead summary table.
+    """
+    async with query_deadline(db, QUERY_TIMEOUT_STATS):
+        return await get_lead_stats(db, filters)
+
+
+async def fetch_lead_changes_service(db: AsyncSession, since: str = None, limit: int = 500):
+    """
+    Retrieve the leads changed and deleted since a sync cursor.
+    """
+    async with query_deadline(db, QUERY_TIMEOUT_SYNC):
+        return await get_lead_changes(db, since, limit)
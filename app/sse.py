@@ -0,0 +1,148 @@
+# app/sse.py
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import AsyncIterator, Optional, Set
+from app.core.config import SSE_QUEUE_SIZE, SSE_KEEPALIVE_INTERVAL, SSE_RETRY_MS, WS_REPLAY_BUFFER_SIZE
+from app.core.metrics import register_metrics
+from app.websockets import ConnectionManager, manager
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_FRAME = b": keep-alive\n\n"
+
+
+def format_event(event_id: str, event: str, data: str) -> bytes:
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+class EventStream:
+    """
+    One SSE subscriber: a bounded queue of encoded frames.
+    """
+    def __init__(self, queue_size: int) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class EventStreamHub:
+    """
+    Fans the lead events published through the WebSocket manager out to SSE streams.
+
+    Each event is encoded once as an SSE frame and shared by every stream. Event ids are
+    `<epoch>:<seq>` as on the WebSocket, and the last WS_REPLAY_BUFFER_SIZE frames are
+    kept, so a client reconnecting with Last-Event-ID gets what it missed, or
+    `resync_required` when that is no longer available. A stream whose queue fills up
+    is closed; the client reconnects and resumes from its last event.
+    """
+    def __init__(self, source: ConnectionManager, queue_size: int = SSE_QUEUE_SIZE) -> None:
+        self.source = source
+        self.queue_size = queue_size
+        self.streams: Set[EventStream] = set()
+        self.history = deque(maxlen=WS_REPLAY_BUFFER_SIZE)  # (seq, encoded frame)
+        self.stats = {
+            "subscribes": 0,
+            "overflows": 0,
+            "frames_out": 0,
+            "keepalives": 0,
+            "replays": 0,
+            "replayed_events": 0,
+            "resyncs": 0,
+        }
+        source.add_listener(self.publish)
+
+    def publish(self, seq: int, event: dict, message: str) -> None:
+        frame = format_event(f"{self.source.epoch}:{seq}", event.get("event", "message"), message)
+        self.history.append((seq, frame))
+        for stream in list(self.streams):
+            try:
+                stream.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._overflow(stream)
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> EventStream:
+        """
+        Register a stream. It starts with the reconnect delay and a `hello`, followed by
+        the events missed since `last_event_id` when given.
+        """
+        stream = EventStream(self.queue_size)
+        self.streams.add(stream)
+        self.stats["subscribes"] += 1
+        stream.queue.put_nowait(f"retry: {SSE_RETRY_MS}\n\n".encode())
+        if last_event_id is None:
+            stream.queue.put_nowait(self._status_frame("hello"))
+        else:
+            self._replay(stream, last_event_id)
+        return stream
+
+    def _status_frame(self, event: str) -> bytes:
+        source = self.source
+        data = json.dumps({"event": event, "epoch": source.epoch, "seq": source.seq})
+        return format_event(f"{source.epoch}:{source.seq}", event, data)
+
+    def _replay(self, stream: EventStream, last_event_id: str) -> None:
+        epoch, _, seq = last_event_id.partition(":")
+        current = self.source.seq
+        oldest_seq = self.history[0][0] if self.history else current + 1
+        last_seq = int(seq) if seq.isdigit() else -1
+        missed = current - last_seq
+        if (
+            epoch != self.source.epoch
+            or not 0 <= last_seq <= current
+            or last_seq < oldest_seq - 1
+            or missed > self.queue_size - 2
+        ):
+            self.stats["resyncs"] += 1
+            stream.queue.put_nowait(self._status_frame("resync_required"))
+            return
+
+        self.stats["replays"] += 1
+        if missed:
+            for _, frame in list(self.history)[-missed:]:
+                stream.queue.put_nowait(frame)
+            self.stats["replayed_events"] += missed
+
+    def unsubscribe(self, stream: EventStream) -> None:
+        self.streams.discard(stream)
+
+    def _overflow(self, stream: EventStream) -> None:
+        self.stats["overflows"] += 1
+        stream.overflowed = True
+        self.unsubscribe(stream)
+        # Wake the stream's reader so it ends the response
+        while not stream.queue.empty():
+            stream.queue.get_nowait()
+        stream.queue.put_nowait(None)
+
+    async def frames(self, last_event_id: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Subscribe a stream and yield its frames, with a keep-alive comment when idle, until
+        the client disconnects or the stream overflows.
+
+        The stream is only registered once iteration starts, so a response that is never
+        sent (the client left first) cannot leave it behind.
+        """
+        stream = self.subscribe(last_event_id)
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(stream.queue.get(), timeout=SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    frame = KEEPALIVE_FRAME
+                    self.stats["keepalives"] += 1
+                if frame is None:
+                    logger.warning("Closing SSE stream: client too slow")
+                    return
+                yield frame
+                self.stats["frames_out"] += 1
+        finally:
+            self.unsubscribe(stream)
+
+    def snapshot(self) -> dict:
+        return {"streams": len(self.streams), "replay_buffer": len(self.history), **self.stats}
+
+
+# Global instance of the EventStreamHub
+event_stream_hub = EventStreamHub(manager)
+register_metrics("sse", event_stream_hub.snapshot)
@@ -0,0 +1,116 @@
+# app/warmup.py
+import asyncio
+import time
+from sqlalchemy import select
+from app.core.config import DB_WARMUP_CONNECTIONS, DB_WARMUP_RETRY_INTERVAL
+from app.core.database import engine
+from app.core.logger import logger
+from app.core.metrics import register_metrics
+from app.crud.lead_query import normalize_lead_query, lead_statements
+
+# (search, filters) of the lead list queries dashboards issue right after a deploy
+# Only the shape matters: the values are bound parameters
+HOT_LEAD_QUERIES = [
+    (None, {}),
+    (None, {"stage": "New"}),
+    (None, {"engaged": "true"}),
+    ("warmup", {}),
+]
+
+
+class StartupState:
+    """
+    Readiness flag and per-phase timings of the application start.
+    """
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.ready = False
+        self.failed_phases = []
+        self.timings = {}
+
+    def record(self, phase: str, started: float) -> None:
+        self.timings[phase] = round(time.perf_counter() - started, 4)
+
+    def snapshot(self) -> dict:
+        return {"ready": self.ready, "failed_phases": list(self.failed_phases), "timings_s": dict(self.timings)}
+
+
+startup_state = StartupState()
+register_metrics("startup", startup_state.snapshot)
+
+
+async def _prepare_hot_queries(conn) -> None:
+    # Nothing may scan `leads` here: the page statement runs with LIMIT 0 as is, the
+    # count and page+facets statements are planned under an outer LIMIT 0
+    for search, filters in HOT_LEAD_QUERIES:
+        shape, params = normalize_lead_query(search, filters)
+        page_params = {**params, "skip": 0, "limit": 0}
+        await conn.execute(lead_statements.get("page", shape), page_params)
+        for kind in ("count", "page_facets"):
+            stmt = lead_statements.get(kind, shape)
+            await conn.execute(select(stmt.subquery()).limit(0), page_params)
+
+
+async def warm_db_pool(connections: int = DB_WARMUP_CONNECTIONS) -> None:
+    """
+    Open `connections` pool connections at once and compile/prepare the hot lead
+    queries on each of them, so the first requests find them ready.
+    """
+    pool_size = engine.pool.size() if hasattr(engine.pool, "size") else connections
+    connections = max(min(connections, pool_size), 1)
+    all_open = asyncio.Barrier(connections)
+
+    async def warm_connection():
+        async with engine.connect() as conn:
+            # Hold every connection until all are open, otherwise the pool hands back the same one
+            await all_open.wait()
+            await _prepare_hot_queries(conn)
+
+    await asyncio.gather(*(warm_connection() for _ in range(connections)))
+
+
+def warm_password_hashing() -> None:
+    """
+    Load the bcrypt backend and run one hash/verify cycle.
+    """
+    from app.utils import pwd_context
+    pwd_context.verify("warmup", pwd_context.hash("warmup"))
+
+
+async def warm_up(app) -> None:
+    """
+    Run the warm-up phases concurrently, record their timings and mark the app ready.
+
+    The app is only ready once the database phase has succeeded: while the pool cannot
+    be opened it is retried every DB_WARMUP_RETRY_INTERVAL seconds and /ready keeps
+    answering 503. The other phases only save latency, so their failure is just logged.
+    """
+    async def timed(phase, make_coro) -> bool:
+        started = time.perf_counter()
+        try:
+            await make_coro()
+            return True
+        except Exception as e:
+            logger.error(f"Warm-up phase {phase} failed: {e}", exc_info=True)
+            return False
+        finally:
+            startup_state.record(phase, started)
+
+    async def db_phase():
+        while not await timed("db_pool", warm_db_pool):
+            if "db_pool" not in startup_state.failed_phases:
+                startup_state.failed_phases.append("db_pool")
+            await asyncio.sleep(DB_WARMUP_RETRY_INTERVAL)
+        if "db_pool" in startup_state.failed_phases:
+            startup_state.failed_phases.remove("db_pool")
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        db_phase(),
+        timed("password_hashing", lambda: asyncio.to_thread(warm_password_hashing)),
+        timed("openapi_schema", lambda: asyncio.to_thread(app.openapi)),
+    )
+    startup_state.record("warm_up", started)
+    startup_state.ready = True
+    startup_state.timings["time_to_ready"] = round(time.perf_counter() - startup_state.started_at, 4)
+    logger.info(f"Application ready: {startup_state.timings}")
@@ -1,52 +1,263 @@
 # app/websockets.py
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List
+from collections import deque
+from typing import Callable, Dict, List, Optional, Set
+import asyncio
+import json
 import logging
+import time
+import uuid
+from app.core.config import (
+    WS_PING_INTERVAL,
+    WS_IDLE_TIMEOUT,
+    WS_SEND_QUEUE_SIZE,
+    WS_SEND_TIMEOUT,
+    WS_INBOUND_RATE,
+    WS_INBOUND_BURST,
+    WS_REPLAY_BUFFER_SIZE,
+)
+from app.core.metrics import register_metrics
 
 logger = logging.getLogger(__name__)
 
+PING_MESSAGE = json.dumps({"event": "ping"})
+
+# Close codes used when evicting a connection
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` events per second with bursts of up to `burst`.
+    """
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ClientConnection:
+    """
+    One connected client: its bounded outbound queue, inbound rate limit and liveness.
+    """
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.inbound = TokenBucket(WS_INBOUND_RATE, WS_INBOUND_BURST)
+        self.last_seen = time.monotonic()
+        self.dropped_in_row = 0
+        self.sender: asyncio.Task = None
+
+
 class ConnectionManager:
     """
     Manages WebSocket connections for real-time updates.
+
+    Every connection gets a sender task draining a bounded queue, so a broadcast never
+    waits on a slow client: a client whose queue is full, whose sends time out, or that
+    has been silent longer than WS_IDLE_TIMEOUT (it is pinged every WS_PING_INTERVAL)
+    is evicted. Inbound messages are rate limited per connection.
+
+    Lead events go through `publish`, which stamps them with a monotonically increasing
+    `seq` (scoped to this process's `epoch`) and keeps the last WS_REPLAY_BUFFER_SIZE of
+    them, so a reconnecting client can resume from its last seen sequence number.
+    Listeners added with `add_listener` receive every published event with its
+    sequence number and serialized form (the SSE hub uses this).
     """
     def __init__(self) -> None:
-        self.active_connections: List[WebSocket] = []
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.history = deque(maxlen=WS_REPLAY_BUFFER_SIZE)  # (seq, serialized event)
+        self.listeners: List[Callable[[int, dict, str], None]] = []
+        self._close_tasks: Set[asyncio.Task] = set()  # closes of evicted connections in progress
+        self.stats = {
+            "connects": 0,
+            "disconnects": 0,
+            "evictions": {"slow_consumer": 0, "idle": 0, "rate_limit": 0, "send_error": 0},
+            "messages_in": 0,
+            "messages_in_dropped": 0,
+            "messages_out": 0,
+            "pings": 0,
+            "replays": 0,
+            "replayed_events": 0,
+            "resyncs": 0,
+        }
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.connections)
 
-    async def connect(self, websocket: WebSocket) -> None:
+    async def connect(self, websocket: WebSocket, last_seq: Optional[int] = None, epoch: Optional[str] = None) -> None:
         """
         Accept and store a new WebSocket connection.
+
+        The client first receives a `hello` with the current epoch and sequence number.
+        If it passes the `last_seq` (and `epoch`) it saw before disconnecting, the missed
+        events are replayed, or `resync_required` is sent when they are no longer available.
         """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = ClientConnection(websocket)
+        connection.sender = asyncio.create_task(self._sender(connection))
+        self.connections[websocket] = connection
+        self.stats["connects"] += 1
         logger.info("WebSocket connected: %s", websocket.client)
 
+        # No await from here on: nothing can be published between the replay and live events
+        connection.queue.put_nowait(json.dumps({"event": "hello", "epoch": self.epoch, "seq": self.seq}))
+        if last_seq is not None:
+            self._replay(connection, last_seq, epoch)
+
+    def _replay(self, connection: ClientConnection, last_seq: int, epoch: Optional[str]) -> None:
+        oldest_seq = self.history[0][0] if self.history else self.seq + 1
+        missed = self.seq - last_seq
+        if (
+            epoch != self.epoch
+            or last_seq > self.seq
+            or last_seq < oldest_seq - 1
+            or missed > connection.queue.maxsize - 1
+        ):
+            self.stats["resyncs"] += 1
+            connection.queue.put_nowait(json.dumps({"event": "resync_required", "epoch": self.epoch, "seq": self.seq}))
+            return
+
+        self.stats["replays"] += 1
+        if missed:
+            for _, message in list(self.history)[-missed:]:
+                connection.queue.put_nowait(message)
+            self.stats["replayed_events"] += missed
+
+    def add_listener(self, listener: Callable[[int, dict, str], None]) -> None:
+        """
+        Call `listener(seq, event, message)` for every published event. It must not block.
+        """
+        self.listeners.append(listener)
+
     def disconnect(self, websocket: WebSocket) -> None:
         """
         Remove a WebSocket connection.
         """
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        connection = self.connections.pop(websocket, None)
+        if connection is not None:
+            if connection.sender is not None and connection.sender is not asyncio.current_task():
+                connection.sender.cancel()
+            self.stats["disconnects"] += 1
             logger.info("WebSocket disconnected: %s", websocket.client)
 
+    def accept_message(self, websocket: WebSocket) -> bool:
+        """
+        Record an inbound message and apply the per-connection rate limit.
+        Returns False if the message must be dropped; persistent flooding evicts the client.
+        """
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return False
+        connection.last_seen = time.monotonic()
+        self.stats["messages_in"] += 1
+        if connection.inbound.allow():
+            connection.dropped_in_row = 0
+            return True
+
+        self.stats["messages_in_dropped"] += 1
+        connection.dropped_in_row += 1
+        if connection.dropped_in_row >= WS_INBOUND_BURST:
+            self._evict(connection, "rate_limit", CLOSE_POLICY_VIOLATION)
+        return False
+
+    async def publish(self, event: dict) -> int:
+        """
+        Stamp a lead event with the next sequence number, retain it for replay and broadcast it.
+        """
+        self.seq += 1
+        message = json.dumps({**event, "seq": self.seq, "epoch": self.epoch})
+        self.history.append((self.seq, message))
+        for listener in self.listeners:
+            listener(self.seq, event, message)
+        await self.broadcast(message)
+        return self.seq
+
     async def broadcast(self, message: str) -> None:
         """
-        Send a message to all active WebSocket connections.
-        If a connection is invalid, remove it from the list.
+        Queue a message for all active WebSocket connections.
+        A connection whose outbound queue is full is evicted as a slow consumer.
         """
-        # Use a shallow copy to iterate safely.
-        for connection in self.active_connections[:]:
+        for connection in list(self.connections.values()):
             try:
-                # If the connection is missing or doesn't have send_text, remove it.
-                if connection is None or not hasattr(connection, "send_text"):
-                    self.active_connections.remove(connection)
-                    continue
-                await connection.send_text(message)
+                connection.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._evict(connection, "slow_consumer", CLOSE_TRY_AGAIN_LATER)
+
+    async def _sender(self, connection: ClientConnection) -> None:
+        websocket = connection.websocket
+        while True:
+            try:
+                message = await asyncio.wait_for(connection.queue.get(), timeout=WS_PING_INTERVAL)
+            except asyncio.TimeoutError:
+                if time.monotonic() - connection.last_seen > WS_IDLE_TIMEOUT:
+                    self._evict(connection, "idle", CLOSE_POLICY_VIOLATION)
+                    return
+                message = PING_MESSAGE
+                self.stats["pings"] += 1
+            try:
+                await asyncio.wait_for(websocket.send_text(message), timeout=WS_SEND_TIMEOUT)
+                self.stats["messages_out"] += 1
+            except asyncio.TimeoutError:
+                self._evict(connection, "slow_consumer", CLOSE_TRY_AGAIN_LATER)
+                return
             except Exception as e:
                 logger.error("Error sending message via websocket: %s", e)
-                try:
-                    self.active_connections.remove(connection)
-                except Exception:
-                    pass
+                self._evict(connection, "send_error", None)
+                return
+
+    def _evict(self, connection: ClientConnection, reason: str, close_code) -> None:
+        if connection.websocket not in self.connections:
+            return
+        self.stats["evictions"][reason] += 1
+        logger.warning("Evicting WebSocket %s: %s", connection.websocket.client, reason)
+        self.disconnect(connection.websocket)
+        if close_code is not None:
+            task = asyncio.create_task(self._close(connection.websocket, close_code))
+            self._close_tasks.add(task)
+            task.add_done_callback(self._close_tasks.discard)
+
+    async def shutdown(self) -> None:
+        """
+        Drop all connections and wait for their sender tasks and pending closes to finish.
+        Closes are bounded by WS_SEND_TIMEOUT.
+        """
+        senders = [c.sender for c in self.connections.values() if c.sender is not None]
+        for websocket in list(self.connections):
+            self.disconnect(websocket)
+        await asyncio.gather(*senders, *self._close_tasks, return_exceptions=True)
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=code), timeout=WS_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    def snapshot(self) -> dict:
+        return {
+            "connected": len(self.connections),
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "replay_buffer": len(self.history),
+            **self.stats,
+            "evictions": dict(self.stats["evictions"]),
+        }
 
 # Global instance of the ConnectionManager
 manager = ConnectionManager()
+register_metrics("websockets", manager.snapshot)
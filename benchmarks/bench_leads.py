@@ -0,0 +1,117 @@
+# benchmarks/bench_leads.py
+"""
+Latency benchmark of the lead endpoints, in process through the ASGI app.
+
+Runs against a throwaway SQLite database unless DATABASE_URL is set (the tables must
+then exist, e.g. after `alembic upgrade head`):
+
+    python benchmarks/bench_leads.py --leads 20000 --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+_own_database = "DATABASE_URL" not in os.environ
+if _own_database:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='artisan-bench-')}/bench.db"
+
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from jose import jwt  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM  # noqa: E402
+from app.core.database import engine, Base  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import lead_deletion, lead_outbox, lead_stats, user  # noqa: E402,F401
+from app.models.lead import Lead  # noqa: E402
+
+STAGES = ["New", "Contacted", "Qualified", "Won", "Lost"]
+
+SCENARIOS = {
+    "list": ("GET", "/leads/leads", {"params": {"limit": 20}}),
+    "list_filtered": ("GET", "/leads/leads", {"params": {"limit": 20, "filters": '{"stage": "Qualified", "engaged": "true"}'}}),
+    "list_facets": ("GET", "/leads/leads", {"params": {"limit": 20, "facets": "true"}}),
+    "search": ("GET", "/leads/leads", {"params": {"limit": 20, "search": "corp 7"}}),
+    "stats": ("GET", "/leads/stats", {}),
+    "changes": ("GET", "/leads/changes", {"params": {"limit": 100}}),
+}
+
+
+async def seed(count: int) -> None:
+    from app.crud.lead_stats_crud import bump_lead_stats, lead_stats_key
+    from app.core.database import SessionLocal
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    rows = [
+        {
+            "name": f"Lead {i}",
+            "email": f"lead{i}@example.com",
+            "company": f"Corp {i % 100}",
+            "stage": STAGES[i % len(STAGES)],
+            "engaged": i % 3 == 0,
+        }
+        for i in range(count)
+    ]
+    async with SessionLocal() as db:
+        for start in range(0, count, 1000):
+            await db.execute(insert(Lead), rows[start:start + 1000])
+        for key, leads in Counter(lead_stats_key(Lead(**row)) for row in rows).items():
+            await bump_lead_stats(db, key, leads)
+        await db.commit()
+
+
+async def run_scenario(client: AsyncClient, headers: dict, scenario: str, requests: int, concurrency: int) -> dict:
+    method, path, kwargs = SCENARIOS[scenario]
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.request(method, path, headers=headers, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main(args) -> None:
+    try:
+        if _own_database:
+            await seed(args.leads)
+        token = jwt.encode({"id": 1, "name": "Benchmark"}, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"{engine.dialect.name}: {args.requests} requests per scenario, concurrency {args.concurrency}")
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for scenario in args.scenarios:
+                result = await run_scenario(client, headers, scenario, args.requests, args.concurrency)
+                print(f"{scenario:15} " + "  ".join(f"{name}={value:9.2f}" for name, value in result.items()))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the lead endpoints.")
+    parser.add_argument("--leads", type=int, default=10000, help="leads to seed (own SQLite database only)")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    asyncio.run(main(parser.parse_args()))
@@ -1,6 +1,78 @@
 # tests/conftest.py
 import sys
 import os
+import asyncio
+import shutil
+import tempfile
+import uuid
+import pytest
+import pytest_asyncio
 
 # Append the project root directory (one level up) to sys.path
-sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
\ No newline at end of file
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+# Every run gets its own database: a throwaway SQLite file by default, or a fresh schema
+# in the PostgreSQL database given by TEST_DATABASE_URL. Set before the app is imported.
+_test_dir = tempfile.mkdtemp(prefix="artisan-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite+aiosqlite:///{_test_dir}/test.db")
+if os.environ["DATABASE_URL"].startswith("postgresql"):
+    os.environ["DATABASE_SCHEMA"] = f"test_{uuid.uuid4().hex[:8]}"
+os.environ.setdefault("EXPORT_DIR", os.path.join(_test_dir, "exports"))
+
+
+def create_test_token(user_id: int = 1) -> str:
+    from jose import jwt
+    from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM
+
+    payload = {"sub": "testuser", "id": user_id, "name": "Test User"}
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+@pytest_asyncio.fixture
+async def async_client():
+    from httpx import AsyncClient, ASGITransport
+    from app.main import app
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def _create_schema():
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.core.database import Base
+    from app.models import lead, lead_deletion, lead_outbox, lead_stats, user  # noqa: F401  register the tables
+
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    schema = os.getenv("DATABASE_SCHEMA")
+    try:
+        async with engine.begin() as conn:
+            if schema:
+                await conn.execute(text(f"CREATE SCHEMA {schema}"))
+                await conn.execute(text(f"SET search_path TO {schema}"))
+            await conn.run_sync(Base.metadata.create_all)
+    finally:
+        await engine.dispose()
+
+
+async def _drop_schema():
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine(os.environ["DATABASE_URL"])
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {os.environ['DATABASE_SCHEMA']} CASCADE"))
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def test_database():
+    asyncio.run(_create_schema())
+    yield
+    from app.core.database import engine
+    asyncio.run(engine.dispose())  # SQLite connections hold worker threads that block exit
+    if os.getenv("DATABASE_SCHEMA"):
+        asyncio.run(_drop_schema())
+    shutil.rmtree(_test_dir, ignore_errors=True)
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from httpx import AsyncClient
+from httpx._transports.asgi import ASGITransport
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from app.main import app as main_app
+from app.middleware import AdmissionControlMiddleware, AdmissionClass, admission_classes, classify_request
+
+release_export = asyncio.Event()
+
+
+async def export(request):
+    await release_export.wait()
+    return PlainTextResponse("id,name\n")
+
+
+async def leads(request):
+    return PlainTextResponse("[]")
+
+
+def test_requests_are_classified_by_route():
+    """
+    Test that exports, reads and writes map to their own classes and health checks are exempt.
+    """
+    assert classify_request("GET", "/leads/export-leads") == "export"
+    assert classify_request("GET", "/leads/export-jobs/abc123/download") == "export"
+    assert classify_request("GET", "/leads/export-jobs/abc123") == "read"
+    assert classify_request("GET", "/leads/leads") == "read"
+    assert classify_request("POST", "/leads/") == "write"
+    assert classify_request("GET", "/health") is None
+
+
+@pytest.mark.asyncio
+async def test_saturated_exports_are_shed_without_blocking_reads():
+    """
+    Test that an export over the limit gets a fast 503 with Retry-After while reads still pass.
+    """
+    classes = {
+        "read": AdmissionClass("read", 2),
+        "write": AdmissionClass("write", 1),
+        "export": AdmissionClass("export", 1, queue_timeout=0.05),
+    }
+    app = AdmissionControlMiddleware(
+        Starlette(routes=[Route("/leads/export-leads", export), Route("/leads/leads", leads)]),
+        classes=classes,
+    )
+    release_export.clear()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        running = asyncio.create_task(client.get("/leads/export-leads"))
+        await asyncio.sleep(0.01)
+
+        shed = await client.get("/leads/export-leads")
+        assert shed.status_code == 503
+        assert shed.headers["retry-after"] == "1"
+
+        read = await client.get("/leads/leads")
+        assert read.status_code == 200
+
+        release_export.set()
+        assert (await running).status_code == 200
+
+    assert classes["export"].snapshot()["shed"]["timeout"] == 1
+    assert classes["export"].in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_shed_responses_carry_cors_headers(monkeypatch):
+    """
+    Test that a browser request shed by admission control still gets CORS headers,
+    so the client can read the 503 and its Retry-After.
+    """
+    monkeypatch.setitem(admission_classes, "export", AdmissionClass("export", 0, max_queue=0))
+    async with AsyncClient(transport=ASGITransport(app=main_app), base_url="http://test") as client:
+        response = await client.get("/leads/export-leads", headers={"Origin": "https://app.example.com"})
+    assert response.status_code == 503
+    assert "access-control-allow-origin" in response.headers
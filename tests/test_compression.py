@@ -0,0 +1,67 @@
+import pytest
+from httpx import AsyncClient
+from httpx._transports.asgi import ASGITransport
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from app.middleware import CompressionMiddleware, _negotiate_encoding, _GzipEncoder
+
+
+async def large(request):
+    return PlainTextResponse("lead," * 1000)
+
+
+async def small(request):
+    return PlainTextResponse("ok")
+
+
+async def stream(request):
+    async def chunks():
+        for i in range(3):
+            yield f"row {i}\n" * 200
+    return StreamingResponse(chunks(), media_type="text/csv")
+
+
+app = CompressionMiddleware(Starlette(routes=[Route("/large", large), Route("/small", small), Route("/stream", stream)]))
+
+
+def test_negotiate_encoding_honours_q_values():
+    """
+    Test that gzip is chosen when it is the only acceptable encoding.
+    """
+    assert _negotiate_encoding("gzip, br;q=0, zstd;q=0") is _GzipEncoder
+    assert _negotiate_encoding("identity") is None
+
+
+@pytest.mark.asyncio
+async def test_compresses_large_and_streaming_bodies_only():
+    """
+    Test that large and streamed bodies are gzip-compressed while small ones are left alone.
+    """
+    headers = {"Accept-Encoding": "gzip"}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/large", headers=headers)
+        assert response.headers["content-encoding"] == "gzip"
+        assert int(response.headers["content-length"]) < 5000
+        assert response.text == "lead," * 1000
+
+        response = await client.get("/stream", headers=headers)
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text.count("\n") == 600
+
+        response = await client.get("/small", headers=headers)
+        assert "content-encoding" not in response.headers
+        assert response.text == "ok"
+
+
+@pytest.mark.asyncio
+async def test_vary_is_set_on_every_negotiable_response():
+    """
+    Test that responses sent uncompressed, because they are small or the client accepts
+    no supported encoding, still carry `Vary: Accept-Encoding`.
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for path, accept_encoding in (("/large", "gzip"), ("/small", "gzip"), ("/large", "identity")):
+            response = await client.get(path, headers={"Accept-Encoding": accept_encoding})
+            assert response.headers["vary"] == "Accept-Encoding"
+        assert "content-encoding" not in response.headers
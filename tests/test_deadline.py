@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from sqlalchemy.exc import DBAPIError
+from app.core.database import SessionLocal
+from app.core.deadline import query_deadline, QueryDeadlineExceeded
+from app.services import lead_service
+from conftest import create_test_token
+
+
+class CancelledByServer(Exception):
+    sqlstate = "57014"
+
+
+class FakePostgresSession:
+    """
+    Stands in for an AsyncSession on PostgreSQL whose statement the server cancels.
+    """
+    bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    def __init__(self) -> None:
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        if len(self.statements) > 1:
+            raise DBAPIError(str(statement), params, CancelledByServer("canceling statement due to statement timeout"))
+
+
+@pytest.mark.asyncio
+async def test_work_past_the_deadline_is_cancelled():
+    """
+    Test that a block running past its deadline is cancelled with QueryDeadlineExceeded,
+    while one finishing in time is left alone.
+    """
+    async with SessionLocal() as db:
+        async with query_deadline(db, 1):
+            await asyncio.sleep(0)
+
+        with pytest.raises(QueryDeadlineExceeded):
+            async with query_deadline(db, 0.01):
+                await asyncio.sleep(5)
+
+
+@pytest.mark.asyncio
+async def test_postgres_statement_timeout_is_set_and_its_cancellation_mapped():
+    """
+    Test that on PostgreSQL the deadline is set as the transaction's statement_timeout and
+    that the server cancelling a statement (SQLSTATE 57014) raises QueryDeadlineExceeded.
+    """
+    db = FakePostgresSession()
+    with pytest.raises(QueryDeadlineExceeded):
+        async with query_deadline(db, 2.5):
+            await db.execute("SELECT count(*) FROM leads")
+    assert db.statements[0] == "SET LOCAL statement_timeout = 2500"
+
+
+@pytest.mark.asyncio
+async def test_slow_lead_list_answers_504(async_client, monkeypatch):
+    """
+    Test that a lead list query running past QUERY_TIMEOUT_LIST answers 504.
+    """
+    async def slow_get_leads(*args, **kwargs):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(lead_service, "QUERY_TIMEOUT_LIST", 0.01)
+    monkeypatch.setattr(lead_service, "get_leads", slow_get_leads)
+    response = await async_client.get(
+        "/leads/leads", params={"search": "deadline"}, headers={"Authorization": f"Bearer {create_test_token()}"}
+    )
+    assert response.status_code == 504
+    assert response.json()["detail"] == "Query deadline exceeded"
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+import pytest
+from app.services.export_jobs import ExportJob, ExportJobManager, COMPLETED
+from conftest import create_test_token
+
+
+def test_job_key_ignores_filter_order():
+    """
+    Test that identical export requests map to the same job key regardless of filter key order.
+    """
+    key_a = ExportJobManager.job_key("acme", {"stage": "New", "engaged": "true"}, "csv", False)
+    key_b = ExportJobManager.job_key("acme", {"engaged": "true", "stage": "New"}, "csv", False)
+    assert key_a == key_b
+    assert key_a != ExportJobManager.job_key("acme", {"stage": "New", "engaged": "true"}, "csv", True)
+    assert key_a != ExportJobManager.job_key("acme", {"stage": "New", "engaged": "true"}, "csv", False, owner=2)
+
+
+def test_sweep_removes_expired_jobs_and_files(tmp_path):
+    """
+    Test that finished jobs older than the TTL are dropped together with their artifact.
+    """
+    manager = ExportJobManager(ttl_seconds=60)
+    job = ExportJob("key", None, {}, "csv", False)
+    job.path = str(tmp_path / "leads.csv")
+    with open(job.path, "w") as f:
+        f.write("ID\n")
+    job.status = COMPLETED
+    job.finished_at = time.time() - 120
+    manager.jobs[job.id] = job
+
+    assert manager.get(job.id, None) is None
+    assert not (tmp_path / "leads.csv").exists()
+
+
+def test_sweep_removes_orphaned_files(tmp_path):
+    """
+    Test that files left in the export directory by a previous process are removed
+    once older than the TTL, while recent ones and files of known jobs are kept.
+    """
+    manager = ExportJobManager(ttl_seconds=60, export_dir=str(tmp_path))
+    job = ExportJob("key", None, {}, "csv", False, str(tmp_path))
+    job.status = COMPLETED
+    job.finished_at = time.time()
+    manager.jobs[job.id] = job
+    old = time.time() - 120
+    for name in ("orphan.csv", "recent.csv", os.path.basename(job.path)):
+        (tmp_path / name).write_text("ID\n")
+    os.utime(tmp_path / "orphan.csv", (old, old))
+    os.utime(job.path, (old, old))
+
+    manager.sweep()
+    assert sorted(os.listdir(tmp_path)) == sorted(["recent.csv", os.path.basename(job.path)])
+
+
+@pytest.mark.asyncio
+async def test_export_job_runs_to_completion_and_supports_range_downloads(async_client):
+    """
+    Test that a submitted export job completes and its file downloads in full and by byte range.
+    """
+    headers = {"Authorization": f"Bearer {create_test_token()}"}
+    lead_data = {"name": "Job Lead", "email": "job@example.com", "stage": "Export Job"}
+    lead_id = (await async_client.post("/leads/", json=lead_data, headers=headers)).json()["id"]
+
+    params = {"format": "csv", "filters": '{"stage": "Export Job"}'}
+    response = await async_client.post("/leads/export-jobs", params=params, headers=headers)
+    assert response.status_code == 202
+    job = response.json()
+    for _ in range(100):
+        if job["status"] in ("completed", "failed"):
+            break
+        await asyncio.sleep(0.02)
+        job = (await async_client.get(f"/leads/export-jobs/{job['id']}", headers=headers)).json()
+    assert job["status"] == "completed"
+    assert job["rows_written"] == job["total_rows"] == 1
+
+    response = await async_client.get(job["download_url"], headers=headers)
+    assert response.status_code == 200
+    body = response.content
+    assert len(body) == job["bytes_written"]
+    assert lead_id.encode() in body
+
+    response = await async_client.get(job["download_url"], headers={**headers, "Range": "bytes=2-9"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 2-9/{len(body)}"
+    assert response.content == body[2:10]
+
+    await async_client.delete(f"/leads/id/{lead_id}", headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_export_jobs_are_private_to_their_owner(async_client):
+    """
+    Test that another user can neither see nor download a job, and that identical
+    requests of two users get separate jobs.
+    """
+    def headers(user_id):
+        return {"Authorization": f"Bearer {create_test_token(user_id)}"}
+
+    params = {"format": "csv", "filters": '{"stage": "Private Export"}'}
+    job = (await async_client.post("/leads/export-jobs", params=params, headers=headers(1))).json()
+    other_job = (await async_client.post("/leads/export-jobs", params=params, headers=headers(2))).json()
+    assert other_job["id"] != job["id"]
+
+    assert (await async_client.get(f"/leads/export-jobs/{job['id']}", headers=headers(2))).status_code == 404
+    assert (await async_client.get(f"/leads/export-jobs/{job['id']}/download", headers=headers(2))).status_code == 404
+    for user_id, job_id in ((1, job["id"]), (2, other_job["id"])):
+        for _ in range(100):
+            response = await async_client.get(f"/leads/export-jobs/{job_id}", headers=headers(user_id))
+            assert response.status_code == 200
+            if response.json()["status"] == "completed":
+                break
+            await asyncio.sleep(0.02)
+    assert (await async_client.get(f"/leads/export-jobs/{job['id']}/download", headers=headers(1))).status_code == 200
+    assert (await async_client.get(f"/leads/export-jobs/{job['id']}/download", headers=headers(2))).status_code == 404
@@ -0,0 +1,83 @@
+import json
+import pytest
+from datetime import datetime, date
+from types import SimpleNamespace
+from app.crud import lead_bulk_crud
+from app.crud.lead_bulk_crud import normalize_bulk_query, _stats_deltas
+from conftest import create_test_token
+
+
+def test_bulk_query_requires_a_valid_selection():
+    """
+    Test that a bulk operation without any filter, or with an unparseable date, is refused
+    instead of silently matching every lead.
+    """
+    with pytest.raises(ValueError):
+        normalize_bulk_query(None, {})
+    with pytest.raises(ValueError):
+        normalize_bulk_query(None, {"sortField": "name"})
+    with pytest.raises(ValueError):
+        normalize_bulk_query(None, {"stage": "New", "createdAtEnd": "31/12/2025"})
+
+    _, params = normalize_bulk_query(None, {"stage": "Stale"})
+    assert params == {"stage": "Stale"}
+
+
+def test_stats_deltas_move_leads_between_buckets():
+    """
+    Test that a bulk stage change moves the counts of each affected bucket in one delta.
+    """
+    rows = [
+        SimpleNamespace(created_at=datetime(2026, 1, 1, 9), stage="New", engaged=False),
+        SimpleNamespace(created_at=datetime(2026, 1, 1, 17), stage="New", engaged=True),
+        SimpleNamespace(created_at=datetime(2026, 1, 1, 12), stage="New", engaged=False),
+    ]
+    deltas = _stats_deltas(rows, {"stage": "Won"})
+    assert deltas[(date(2026, 1, 1), "New", False)] == -2
+    assert deltas[(date(2026, 1, 1), "Won", False)] == 2
+    assert deltas[(date(2026, 1, 1), "Won", True)] == 1
+
+    assert sum(_stats_deltas(rows).values()) == -3
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_and_delete_by_filter(async_client, monkeypatch):
+    """
+    Test that PATCH and DELETE /leads change every matching lead in chunks, keep the
+    pipeline stats in step and leave tombstones for delta sync.
+    """
+    monkeypatch.setattr(lead_bulk_crud, "LEAD_BULK_CHUNK_SIZE", 2)
+    headers = {"Authorization": f"Bearer {create_test_token()}"}
+    lead_ids = []
+    for i in range(5):
+        lead_data = {"name": f"Bulk {i}", "email": f"bulk{i}@example.com", "stage": "Bulk New", "engaged": False}
+        lead_ids.append((await async_client.post("/leads/", json=lead_data, headers=headers)).json()["id"])
+    stats_before = (await async_client.get("/leads/stats", headers=headers)).json()
+
+    response = await async_client.patch(
+        "/leads", params={"filters": json.dumps({"stage": "Bulk New"})},
+        json={"stage": "Bulk Won", "engaged": True}, headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json() == {"affected": 5, "chunks": 3}
+
+    params = {"limit": 10, "filters": json.dumps({"stage": "Bulk Won"})}
+    updated = (await async_client.get("/leads/leads", params=params, headers=headers)).json()
+    assert sorted(lead["id"] for lead in updated["items"]) == sorted(lead_ids)
+    assert all(lead["engaged"] for lead in updated["items"])
+    stats = (await async_client.get("/leads/stats", headers=headers)).json()
+    assert stats["by_stage"].get("Bulk New", 0) == 0
+    assert stats["by_stage"]["Bulk Won"] == 5
+    assert stats["engaged"] == stats_before["engaged"] + 5
+
+    cursor = (await async_client.get("/leads/changes", params={"limit": 1000}, headers=headers)).json()["cursor"]
+    response = await async_client.request(
+        "DELETE", "/leads", params={"filters": json.dumps({"stage": "Bulk Won"})}, headers=headers,
+    )
+    assert response.json() == {"affected": 5, "chunks": 3}
+
+    changes = (await async_client.get("/leads/changes", params={"since": cursor}, headers=headers)).json()
+    assert sorted(tombstone["id"] for tombstone in changes["deleted"]) == sorted(lead_ids)
+    stats = (await async_client.get("/leads/stats", headers=headers)).json()
+    assert stats["by_stage"].get("Bulk Won", 0) == 0
+    assert stats["total"] == stats_before["total"] - 5
@@ -0,0 +1,61 @@
+import pytest
+from app.core.config import LEAD_FILTER_MAX_IN_VALUES
+from app.crud.lead_query import normalize_lead_query, LeadStatementRegistry
+
+
+def test_same_filter_combination_shares_one_shape():
+    """
+    Test that requests differing only in filter values map to the same statement shape.
+    """
+    shape_a, params_a = normalize_lead_query("acme", {"stage": "New", "sortField": "name", "sortOrder": "asc"})
+    shape_b, params_b = normalize_lead_query("globex", {"stage": "Won", "sortField": "name", "sortOrder": "asc"})
+    assert shape_a == shape_b
+    assert params_a == {"search": "%acme%", "stage": "New"}
+    assert params_b["stage"] == "Won"
+
+    shape_c, _ = normalize_lead_query("acme", {"stage": "New"})
+    assert shape_c != shape_a
+
+
+def test_unknown_sort_field_is_rejected():
+    """
+    Test that sorting by a column that does not exist raises instead of building a new shape.
+    """
+    with pytest.raises(ValueError):
+        normalize_lead_query(None, {"sortField": "__class__"})
+
+
+def test_registry_builds_each_shape_once():
+    """
+    Test that the registry hands out the same statement object for a repeated shape.
+    """
+    registry = LeadStatementRegistry()
+    shape, _ = normalize_lead_query("acme", {"engaged": "true"})
+    assert registry.get("page", shape) is registry.get("page", shape)
+    assert registry.snapshot()["misses"] == 1
+    assert registry.snapshot()["hits"] == 1
+
+
+def test_where_filter_values_are_bound_parameters():
+    """
+    Test that `where` filters with the same structure share a shape whatever their values,
+    and that fields outside the whitelist and over-long in-lists are rejected.
+    """
+    def where(stages, prefix):
+        return {"where": {"or": [
+            {"field": "stage", "op": "in", "value": stages},
+            {"field": "company", "op": "prefix", "value": prefix},
+        ]}}
+
+    shape_a, params_a = normalize_lead_query(None, where(["New"], "Acme"))
+    shape_b, params_b = normalize_lead_query(None, where(["Won", "Lost"], "100%_"))
+    assert shape_a == shape_b
+    assert params_a == {"w0": ("New",), "w1": "Acme%"}
+    assert params_b["w1"] == "100\\%\\_%"
+
+    with pytest.raises(ValueError):
+        normalize_lead_query(None, {"where": {"field": "phone", "op": "eq", "value": "1"}})
+    with pytest.raises(ValueError):
+        normalize_lead_query(None, where(["New"] * (LEAD_FILTER_MAX_IN_VALUES + 1), "Acme"))
+    with pytest.raises(ValueError):
+        normalize_lead_query(None, {"where": {"and": [{"field": "stage", "op": "eq", "value": "New", "extra": 1}]}})
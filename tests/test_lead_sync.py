@@ -0,0 +1,42 @@
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from app.core.config import LEAD_SYNC_SAFETY_SECONDS
+from app.crud.lead_sync_crud import encode_sync_cursor, decode_sync_cursor, sync_safe_point, SyncCursorExpired
+
+
+def test_sync_cursor_round_trip():
+    """
+    Test that a sync cursor decodes to the position it was encoded from.
+    """
+    cursor = encode_sync_cursor(datetime(2026, 1, 2, 3, 4, 5), "a46d953a-ace1-4352-b36e-dd6a2bce9d02", 42)
+    position = decode_sync_cursor(cursor)
+    assert position["updated_at"] == datetime(2026, 1, 2, 3, 4, 5)
+    assert str(position["lead_id"]) == "a46d953a-ace1-4352-b36e-dd6a2bce9d02"
+    assert position["deletion_id"] == 42
+
+    with pytest.raises(ValueError):
+        decode_sync_cursor("not-a-cursor")
+
+
+def test_sync_cursor_expires_with_tombstone_retention(monkeypatch):
+    """
+    Test that a cursor older than the tombstone retention asks for a full resync.
+    """
+    cursor = encode_sync_cursor(None, None, 0)
+    monkeypatch.setattr(time, "time", lambda: 10**10)
+    with pytest.raises(SyncCursorExpired):
+        decode_sync_cursor(cursor)
+
+
+def test_safe_point_of_an_aware_db_now_compares_with_naive_updated_at():
+    """
+    Test that PostgreSQL's timestamptz now() gives a naive UTC safe point that can be
+    compared with the naive updated_at column.
+    """
+    db_now = datetime(2026, 1, 2, 5, 4, 5, tzinfo=timezone(timedelta(hours=2)))
+    updated_at = datetime(2026, 1, 2, 3, 4, 5)
+    safe_point = sync_safe_point(db_now)
+    assert safe_point == datetime(2026, 1, 2, 3, 4, 5) - timedelta(seconds=LEAD_SYNC_SAFETY_SECONDS)
+    assert updated_at > safe_point
+    assert sync_safe_point(updated_at) == safe_point
@@ -1,22 +1,9 @@
+import gzip
+import json
 import pytest
-import pytest_asyncio
-from httpx import AsyncClient
-from httpx._transports.asgi import ASGITransport
-from app.main import app
-from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM
-from jose import jwt
-from typing import AsyncGenerator
-
-def create_test_token():
-    payload = {"sub": "testuser", "id": 1, "name": "Test User"}
-    token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-    return token
-
-@pytest_asyncio.fixture
-async def async_client() -> AsyncGenerator[AsyncClient, None]:
-    transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as client:
-        yield client
+from app.core.database import engine
+from sqlalchemy import event
+from conftest import create_test_token
 
 @pytest.mark.asyncio
 async def test_create_duplicate_lead(async_client):
@@ -91,4 +78,196 @@ async def test_get_leads(async_client):
     response = await async_client.get("/leads/leads", params={"skip": 0, "limit": 10}, headers=headers)
     assert response.status_code == 200
     json_resp = response.json()
-    assert isinstance(json_resp, list) or "items" in json_resp
\ No newline at end of file
+    assert isinstance(json_resp, list) or "items" in json_resp
+
+@pytest.mark.asyncio
+async def test_get_lead_stats(async_client):
+    """
+    Test that creating a lead is reflected in the pipeline statistics.
+    """
+    token = create_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    before = (await async_client.get("/leads/stats", headers=headers)).json()
+
+    lead_data = {"name": "Stats Lead", "email": "stats@example.com", "stage": "Qualified", "engaged": True}
+    response = await async_client.post("/leads/", json=lead_data, headers=headers)
+    assert response.status_code == 201
+    lead_id = response.json()["id"]
+
+    response = await async_client.get("/leads/stats", headers=headers)
+    assert response.status_code == 200
+    after = response.json()
+    assert after["total"] == before["total"] + 1
+    assert after["engaged"] == before["engaged"] + 1
+    assert after["by_stage"]["Qualified"] == before["by_stage"].get("Qualified", 0) + 1
+
+    await async_client.delete(f"/leads/id/{lead_id}", headers=headers)
+    after_delete = (await async_client.get("/leads/stats", headers=headers)).json()
+    assert after_delete["total"] == before["total"]
+
+@pytest.mark.asyncio
+async def test_get_leads_with_facets(async_client):
+    """
+    Test that facet counts are returned alongside the page and add up to the total.
+    """
+    token = create_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await async_client.get(
+        "/leads/leads", params={"skip": 0, "limit": 1, "facets": "true"}, headers=headers
+    )
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert set(json_resp["facets"]) == {"stage", "engaged"}
+    assert sum(f["count"] for f in json_resp["facets"]["stage"]) == json_resp["total"]
+    assert sum(f["count"] for f in json_resp["facets"]["engaged"]) == json_resp["total"]
+
+@pytest.mark.asyncio
+async def test_facets_come_back_with_the_page_in_one_statement(async_client):
+    """
+    Test that with facets the page (in sort order), the total and the facet counts are
+    fetched with a single statement and match the plain list.
+    """
+    token = create_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    lead_ids = []
+    for name in ("Facet C", "Facet A", "Facet B"):
+        lead_data = {"name": name, "email": f"{name.replace(' ', '.').lower()}@example.com", "stage": "Faceted"}
+        lead_ids.append((await async_client.post("/leads/", json=lead_data, headers=headers)).json()["id"])
+    params = {"limit": 2, "skip": 0, "filters": json.dumps({"stage": "Faceted", "sortField": "name", "sortOrder": "asc"})}
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = await async_client.get("/leads/leads", params={**params, "facets": "true"}, headers=headers)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    assert response.status_code == 200
+    with_facets = response.json()
+    plain = (await async_client.get("/leads/leads", params=params, headers=headers)).json()
+
+    assert len(statements) == 1
+    assert [lead["name"] for lead in with_facets["items"]] == ["Facet A", "Facet B"]
+    assert with_facets["items"] == plain["items"]
+    assert with_facets["total"] == plain["total"] == 3
+    assert with_facets["facets"]["stage"] == [{"value": "Faceted", "count": 3}]
+
+    for lead_id in lead_ids:
+        await async_client.delete(f"/leads/id/{lead_id}", headers=headers)
+
+@pytest.mark.asyncio
+async def test_export_leads_filtered_gzip_ndjson(async_client):
+    """
+    Test that an export honours the filters and can be streamed as gzip-compressed NDJSON.
+    """
+    token = create_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    lead_data = {"name": "Export Lead", "email": "export@example.com", "stage": "Export Stage"}
+    lead_id = (await async_client.post("/leads/", json=lead_data, headers=headers)).json()["id"]
+
+    params = {"format": "ndjson", "compress": "true", "filters": json.dumps({"stage": "Export Stage"})}
+    response = await async_client.get("/leads/export-leads", params=params, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert "leads.ndjson.gz" in response.headers["content-disposition"]
+    lines = gzip.decompress(response.content).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [lead_id]
+    assert json.loads(lines[0])["stage"] == "Export Stage"
+
+    await async_client.delete(f"/leads/id/{lead_id}", headers=headers)
+
+@pytest.mark.asyncio
+async def test_batch_get_leads_keeps_request_order(async_client):
+    """
+    Test that a batch lookup returns leads in request order with explicit misses.
+    """
+    token = create_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    lead_data = {"name": "Batch Lead", "email": "batch@example.com", "stage": "New", "engaged": False}
+    lead_id = (await async_client.post("/leads/", json=lead_data, headers=headers)).json()["id"]
+    missing_id = "00000000-0000-0000-0000-000000000000"
+
+    response = await async_client.post("/leads/batch-get", json={"ids": [missing_id, lead_id]}, headers=headers)
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert json_resp["items"][0] is None
+    assert json_resp["items"][1]["id"] == lead_id
+    assert json_resp["missing"] == [missing_id]
+
+    await async_client.delete(f"/leads/id/{lead_id}", headers=headers)
+
+@pytest.mark.asyncio
+async def test_lead_changes_reports_deletions(async_client):
+    """
+    Test that a delta sync returns a new lead and, after its deletion, its tombstone.
+    """
+    token = create_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    lead_data = {"name": "Sync Lead", "email": "sync@example.com", "stage": "New", "engaged": False}
+    lead_id = (await async_client.post("/leads/", json=lead_data, headers=headers)).json()["id"]
+
+    response = await async_client.get("/leads/changes", params={"limit": 1000}, headers=headers)
+    assert response.status_code == 200
+    json_resp = response.json()
+    assert lead_id in [lead["id"] for lead in json_resp["items"]]
+
+    await async_client.delete(f"/leads/id/{lead_id}", headers=headers)
+    response = await async_client.get("/leads/changes", params={"since": json_resp["cursor"]}, headers=headers)
+    assert response.status_code == 200
+    assert [tombstone["id"] for tombstone in response.json()["deleted"]] == [lead_id]
+
+@pytest.mark.asyncio
+async def test_get_leads_with_where_filter(async_client):
+    """
+    Test that the `where` filter combines in-lists, prefixes and ranges, and that an
+    invalid filter or date is rejected with 400 instead of being ignored.
+    """
+    token = create_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    lead_ids = []
+    for name, stage in [("Where Alpha", "Won"), ("Where Beta", "Lost"), ("Other Gamma", "Won")]:
+        lead_data = {"name": name, "email": f"{name.replace(' ', '.').lower()}@example.com", "stage": stage}
+        lead_ids.append((await async_client.post("/leads/", json=lead_data, headers=headers)).json()["id"])
+
+    where = {"and": [
+        {"field": "stage", "op": "in", "value": ["Won", "Qualified"]},
+        {"or": [
+            {"field": "name", "op": "prefix", "value": "Where"},
+            {"field": "email", "op": "eq", "value": "nobody@example.com"},
+        ]},
+        {"field": "created_at", "op": "range", "value": {"gte": "2020-01-01", "lt": "2100-01-01T00:00:00Z"}},
+    ]}
+    filters = json.dumps({"where": where, "sortField": "name", "sortOrder": "asc"})
+    response = await async_client.get("/leads/leads", params={"filters": filters}, headers=headers)
+    assert response.status_code == 200
+    assert [lead["name"] for lead in response.json()["items"]] == ["Where Alpha"]
+
+    # Prefixes are case-sensitive, on SQLite as on PostgreSQL
+    lowercase = json.dumps({"where": {"field": "name", "op": "prefix", "value": "where"}})
+    response = await async_client.get("/leads/leads", params={"filters": lowercase}, headers=headers)
+    assert response.json()["items"] == []
+
+    for invalid in [
+        {"where": {"field": "phone", "op": "eq", "value": "123"}},  # not indexed
+        {"where": {"field": "stage", "op": "range", "value": {"gte": "A"}}},
+        {"sortField": "last_contacted"},
+        {"createdAtStart": "31/12/2025"},
+    ]:
+        response = await async_client.get("/leads/leads", params={"filters": json.dumps(invalid)}, headers=headers)
+        assert response.status_code == 400, invalid
+
+    for lead_id in lead_ids:
+        await async_client.delete(f"/leads/id/{lead_id}", headers=headers)
+
+@pytest.mark.asyncio
+async def test_get_lead_stats_rejects_unsupported_filters(async_client):
+    """
+    Test that stats filters the summary table cannot answer are rejected instead of ignored.
+    """
+    token = create_test_token()
+    headers = {"Authorization": f"Bearer {token}"}
+    where = {"where": {"field": "stage", "op": "eq", "value": "New"}}
+    response = await async_client.get("/leads/stats", params={"filters": json.dumps(where)}, headers=headers)
+    assert response.status_code == 400
+    response = await async_client.get("/leads/stats", params={"filters": '{"stage": "New"}'}, headers=headers)
+    assert response.status_code == 200
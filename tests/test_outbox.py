@@ -0,0 +1,66 @@
+import pytest
+from app.core.database import SessionLocal
+from app.outbox import OutboxDispatcher, enqueue_lead_event
+
+
+async def _drain_outbox():
+    # Events enqueued by earlier tests are never delivered there (no lifespan runs)
+    dispatcher = OutboxDispatcher()
+    dispatcher.consumers = []
+    while await dispatcher.dispatch_batch():
+        pass
+
+
+@pytest.mark.asyncio
+async def test_committed_events_are_delivered_in_order_then_deleted():
+    """
+    Test that the dispatcher delivers committed outbox events in order, in batches,
+    with their event_id, and removes them once delivered.
+    """
+    await _drain_outbox()
+    delivered = []
+
+    async def consumer(event):
+        delivered.append(event)
+
+    dispatcher = OutboxDispatcher(batch_size=2)
+    dispatcher.consumers = [consumer]
+
+    async with SessionLocal() as db:
+        for i in range(3):
+            enqueue_lead_event(db, {"event": "lead_created", "n": i})
+        await db.commit()
+        enqueue_lead_event(db, {"event": "lead_created", "n": "rolled back"})
+        await db.rollback()
+
+    assert await dispatcher.dispatch_batch() == 2
+    assert await dispatcher.dispatch_batch() == 1
+    assert await dispatcher.dispatch_batch() == 0
+    assert [event["n"] for event in delivered] == [0, 1, 2]
+    assert delivered[0]["event_id"] < delivered[1]["event_id"]
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_is_retried():
+    """
+    Test that events whose delivery failed stay in the outbox and are delivered again.
+    """
+    await _drain_outbox()
+    attempts = []
+
+    async def flaky_consumer(event):
+        attempts.append(event["n"])
+        if len(attempts) == 1:
+            raise ConnectionError("consumer unavailable")
+
+    dispatcher = OutboxDispatcher()
+    dispatcher.consumers = [flaky_consumer]
+
+    async with SessionLocal() as db:
+        enqueue_lead_event(db, {"event": "lead_deleted", "n": 1})
+        await db.commit()
+
+    with pytest.raises(ConnectionError):
+        await dispatcher.dispatch_batch()
+    assert await dispatcher.dispatch_batch() == 1
+    assert attempts == [1, 1]
@@ -0,0 +1,125 @@
+import pytest
+from datetime import date
+from sqlalchemy.dialects import postgresql
+from app.core.partitions import (
+    add_months,
+    partition_name,
+    parse_month,
+    ensure_lead_partitions,
+    archive_lead_partitions,
+    explain_lead_query,
+)
+
+
+class FakeResult:
+    def __init__(self, rows) -> None:
+        self.rows = rows
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeConnection:
+    """
+    Records the SQL run by the partition maintenance, answering its catalog lookups.
+    """
+    dialect = postgresql.dialect()
+
+    def __init__(self, partitions, default_rows_months=()) -> None:
+        self.partitions = partitions
+        self.default_rows_months = default_rows_months
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = str(statement)
+        if "pg_partitioned_table" in sql:
+            return FakeResult([(1,)])
+        if "pg_inherits" in sql:
+            return FakeResult([(name,) for name in self.partitions])
+        if sql.startswith("SELECT EXISTS"):
+            return FakeResult([(params["lower"] in self.default_rows_months,)])
+        self.statements.append(sql)
+        return FakeResult([])
+
+    async def exec_driver_sql(self, sql):
+        self.statements.append(sql)
+        return FakeResult([("Aggregate",)])
+
+
+def test_month_arithmetic_crosses_year_boundaries():
+    """
+    Test that partition bounds roll over correctly at the end of the year.
+    """
+    assert add_months(date(2025, 11, 1), 2) == date(2026, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert parse_month("2026-03") == date(2026, 3, 1)
+    assert parse_month("2026-03-17") == date(2026, 3, 1)
+    assert partition_name(date(2026, 3, 1)) == "leads_y2026m03"
+
+
+@pytest.mark.asyncio
+async def test_ensure_creates_missing_partitions_and_moves_default_rows():
+    """
+    Test that ensure creates only the missing months, and that a month whose rows already
+    sit in the default partition is moved out of it instead of failing.
+    """
+    this_month = date.today().replace(day=1)
+    next_month, later = add_months(this_month, 1), add_months(this_month, 2)
+    conn = FakeConnection(["leads_default", partition_name(this_month)], default_rows_months=[later])
+
+    created = await ensure_lead_partitions(conn, months_ahead=2)
+
+    assert created == [partition_name(next_month), partition_name(later)]
+    assert conn.statements == [
+        f"CREATE TABLE {partition_name(next_month)} PARTITION OF leads "
+        f"FOR VALUES FROM ('{next_month}') TO ('{later}')",
+        "ALTER TABLE leads DETACH PARTITION leads_default",
+        f"CREATE TABLE {partition_name(later)} (LIKE leads INCLUDING DEFAULTS)",
+        f"INSERT INTO {partition_name(later)} SELECT * FROM leads_default "
+        f"WHERE created_at >= '{later}' AND created_at < '{add_months(later, 1)}'",
+        f"DELETE FROM leads_default WHERE created_at >= '{later}' AND created_at < '{add_months(later, 1)}'",
+        f"ALTER TABLE leads ATTACH PARTITION {partition_name(later)} "
+        f"FOR VALUES FROM ('{later}') TO ('{add_months(later, 1)}')",
+        "ALTER TABLE leads ATTACH PARTITION leads_default DEFAULT",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_archive_detaches_only_months_before_the_cutoff():
+    """
+    Test that archiving detaches the partitions ending before the cutoff, leaves tombstones,
+    releases their emails and stats, and moves them to the archive schema.
+    """
+    conn = FakeConnection(["leads_default", "leads_y2025m11", "leads_y2025m12", "leads_y2026m01"])
+
+    archived = await archive_lead_partitions(conn, date(2026, 1, 1))
+
+    assert archived == ["leads_y2025m11", "leads_y2025m12"]
+    assert conn.statements[0] == "CREATE SCHEMA IF NOT EXISTS archive"
+    assert conn.statements[1:6] == [
+        "ALTER TABLE leads DETACH PARTITION leads_y2025m11",
+        "INSERT INTO lead_deletions (lead_id, deleted_at) SELECT id, now() FROM leads_y2025m11",
+        "DELETE FROM lead_emails WHERE lead_id IN (SELECT id FROM leads_y2025m11)",
+        "DELETE FROM lead_daily_stats WHERE day >= :lower AND day < :upper",
+        "ALTER TABLE leads_y2025m11 SET SCHEMA archive",
+    ]
+    assert not any("leads_y2026m01" in statement for statement in conn.statements)
+
+
+@pytest.mark.asyncio
+async def test_explain_passes_created_at_bounds_as_constants():
+    """
+    Test that the date filters reach EXPLAIN as literal bounds on the partition key,
+    which is what lets the planner prune the other months.
+    """
+    conn = FakeConnection([])
+
+    await explain_lead_query(conn, filters={"createdAtStart": "2026-11-01", "createdAtEnd": "2026-11-30"})
+
+    [sql] = conn.statements
+    assert sql.startswith("EXPLAIN SELECT count(")
+    assert "leads.created_at >= '2026-11-01 00:00:00'" in sql
+    assert "leads.created_at <= '2026-11-30 00:00:00'" in sql
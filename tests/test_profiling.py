@@ -0,0 +1,45 @@
+import pytest
+from httpx import AsyncClient
+from httpx._transports.asgi import ASGITransport
+from app import profiling
+from app.main import app
+from app.profiling import sign_profile_token, verify_profile_token
+
+
+def test_profile_token_requires_secret_and_valid_signature(monkeypatch):
+    """
+    Test that tokens are rejected without a configured secret, when tampered with or expired.
+    """
+    assert not verify_profile_token(sign_profile_token(secret="s3cret"))
+
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", "s3cret")
+    token = sign_profile_token(60)
+    assert verify_profile_token(token)
+    assert not verify_profile_token(token[:-1] + ("0" if token[-1] != "0" else "1"))
+    assert not verify_profile_token(sign_profile_token(-1))
+
+
+@pytest.mark.asyncio
+async def test_signed_request_is_profiled_and_retrievable(monkeypatch):
+    """
+    Test that a request with a valid token gets an X-Profile-Id whose profile splits DB and
+    Python time and can be downloaded in collapsed format; unsigned requests are not profiled.
+    """
+    monkeypatch.setattr(profiling, "PROFILE_SECRET", "s3cret")
+    headers = {"X-Profile-Token": sign_profile_token(60)}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/db-check")
+        assert "x-profile-id" not in response.headers
+
+        response = await client.get("/db-check", headers=headers)
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+
+        summary = (await client.get(f"/debug/profiles/{profile_id}", headers=headers)).json()
+        assert summary["statements"] >= 1
+        assert summary["db_ms"] <= summary["wall_ms"]
+
+        collapsed = await client.get(f"/debug/profiles/{profile_id}", params={"format": "collapsed"}, headers=headers)
+        assert collapsed.status_code == 200
+
+        assert (await client.get("/debug/profiles")).status_code == 403
@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    """
+    Test that concurrent calls with the same key run once and all get the result.
+    """
+    flights = SingleFlight()
+    executions = 0
+
+    async def query():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return {"items": [], "total": 0}
+
+    results = await asyncio.gather(*(flights.do("page-1", query) for _ in range(50)), flights.do("page-2", query))
+    assert executions == 2
+    assert results[0] is results[49]
+    assert flights.snapshot()["coalesced"] == 49
+
+    await flights.do("page-1", query)
+    assert executions == 3
+
+
+@pytest.mark.asyncio
+async def test_invalidate_starts_a_fresh_execution():
+    """
+    Test that callers arriving after invalidate() do not join the earlier flight.
+    """
+    flights = SingleFlight()
+    release = asyncio.Event()
+    calls = []
+
+    async def query():
+        calls.append(len(calls))
+        await release.wait()
+        return len(calls)
+
+    first = asyncio.create_task(flights.do("page", query))
+    await asyncio.sleep(0)
+    flights.invalidate()
+    second = asyncio.create_task(flights.do("page", query))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, second)
+    assert len(calls) == 2
@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+from app.main import app
+from app.sse import EventStreamHub, KEEPALIVE_FRAME, event_stream_hub
+from app.websockets import ConnectionManager
+from conftest import create_test_token
+
+
+def _drain(stream) -> list:
+    frames = []
+    while not stream.queue.empty():
+        frames.append(stream.queue.get_nowait())
+    return frames
+
+
+@pytest.mark.asyncio
+async def test_events_are_encoded_once_and_resumed_from_last_event_id():
+    """
+    Test that every stream gets the same encoded frame, and that a client reconnecting
+    with Last-Event-ID receives only the events it missed.
+    """
+    source = ConnectionManager()
+    hub = EventStreamHub(source, queue_size=8)
+    first, second = hub.subscribe(), hub.subscribe()
+    _drain(first), _drain(second)
+
+    await source.publish({"event": "lead_created", "lead": {"id": "1"}})
+    frame = _drain(first)[0]
+    assert frame is _drain(second)[0]
+    assert frame.startswith(f"id: {source.epoch}:1\nevent: lead_created\ndata: ".encode())
+
+    await source.publish({"event": "lead_updated", "lead": {"id": "1"}})
+    await source.publish({"event": "lead_deleted", "lead_id": "1"})
+    resumed = _drain(hub.subscribe(f"{source.epoch}:1"))
+    assert resumed[0].startswith(b"retry: ")
+    assert [f[:len(f"id: {source.epoch}:2")] for f in resumed[1:]] == [
+        f"id: {source.epoch}:2".encode(), f"id: {source.epoch}:3".encode()
+    ]
+
+    stale = _drain(hub.subscribe("old-epoch:3"))
+    assert b"event: resync_required" in stale[1]
+    assert hub.snapshot()["resyncs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_overflowing_stream_is_closed_and_idle_stream_gets_keepalives(monkeypatch):
+    """
+    Test that a stream whose buffer fills up is dropped and ended, and that an idle
+    stream receives keep-alive comments.
+    """
+    monkeypatch.setattr("app.sse.SSE_KEEPALIVE_INTERVAL", 0.01)
+    source = ConnectionManager()
+    hub = EventStreamHub(source, queue_size=4)
+    slow, idle = hub.frames(), hub.frames()
+    assert not hub.streams  # nothing is subscribed before a stream is iterated
+    assert (await slow.__anext__()).startswith(b"retry: ")
+    assert len([await idle.__anext__() for _ in range(2)]) == 2  # retry, hello
+    assert await idle.__anext__() == KEEPALIVE_FRAME
+
+    for i in range(4):
+        await source.publish({"event": "lead_created", "n": i})
+    assert len(hub.streams) == 1
+    assert [frame async for frame in slow] == []
+    assert hub.snapshot()["overflows"] == 1
+    await idle.aclose()
+    assert not hub.streams
+    await asyncio.sleep(0)
+
+
+async def _open_event_stream(query_string: bytes = b"", headers: list = ()):
+    """
+    Open GET /leads/events directly over ASGI (httpx waits for the whole body, which an
+    event stream never finishes), then disconnect after the first frame.
+    Returns the status and the body received.
+    """
+    messages, got_body, disconnected = [], asyncio.Event(), asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body":
+            got_body.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/leads/events", "raw_path": b"/leads/events",
+        "root_path": "", "query_string": query_string, "headers": list(headers),
+        "client": ("testclient", 50000), "server": ("test", 80),
+    }
+    response = asyncio.create_task(app(scope, receive, send))
+    await asyncio.wait_for(got_body.wait(), timeout=5)
+    disconnected.set()
+    await asyncio.wait_for(response, timeout=5)
+    return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+
+@pytest.mark.asyncio
+async def test_event_stream_accepts_token_from_query_or_cookie():
+    """
+    Test that /leads/events, which EventSource opens without an Authorization header,
+    accepts the JWT as the access_token query parameter or cookie, and that the
+    stream is dropped from the hub once the client disconnects.
+    """
+    token = create_test_token().encode()
+    for query_string, headers in [
+        (b"access_token=" + token, []),
+        (b"", [(b"cookie", b"access_token=" + token)]),
+        (b"", [(b"authorization", b"Bearer " + token)]),
+    ]:
+        status, body = await _open_event_stream(query_string, headers)
+        assert status == 200
+        assert body.startswith(b"retry: ")
+        assert not event_stream_hub.streams
+
+    assert (await _open_event_stream())[0] == 403
+    assert (await _open_event_stream(b"access_token=not-a-jwt"))[0] == 401
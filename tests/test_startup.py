@@ -0,0 +1,52 @@
+import pytest
+from httpx import AsyncClient
+from httpx._transports.asgi import ASGITransport
+from app.main import app
+from app import warmup
+from app.warmup import startup_state
+
+
+@pytest.mark.asyncio
+async def test_ready_reports_warm_up_state():
+    """
+    Test that /ready answers 503 until the warm-up has marked the app ready, then 200.
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        startup_state.ready = False
+        response = await client.get("/ready")
+        assert response.status_code == 503
+        assert "import" in response.json()["timings_s"]
+
+        startup_state.ready = True
+        try:
+            response = await client.get("/ready")
+            assert response.status_code == 200
+        finally:
+            startup_state.ready = False
+
+
+@pytest.mark.asyncio
+async def test_failed_db_warm_up_keeps_app_not_ready_until_it_succeeds(monkeypatch):
+    """
+    Test that the app is not marked ready while the database warm-up fails, and that
+    the warm-up is retried until it succeeds.
+    """
+    attempts = []
+    ready_during_failure = []
+
+    async def flaky_warm_db_pool():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("database unreachable")
+        ready_during_failure.append((startup_state.ready, list(startup_state.failed_phases)))
+        await real_warm_db_pool(connections=1)
+
+    real_warm_db_pool = warmup.warm_db_pool
+    monkeypatch.setattr(warmup, "warm_db_pool", flaky_warm_db_pool)
+    monkeypatch.setattr(warmup, "DB_WARMUP_RETRY_INTERVAL", 0.01)
+    try:
+        await warmup.warm_up(app)
+        assert ready_during_failure == [(False, ["db_pool"])]
+        assert startup_state.ready and startup_state.failed_phases == []
+    finally:
+        startup_state.ready = False
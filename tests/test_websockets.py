@@ -0,0 +1,138 @@
+import asyncio
+import json
+import pytest
+import pytest_asyncio
+from app.core.config import WS_SEND_QUEUE_SIZE, WS_INBOUND_BURST
+from app.websockets import ConnectionManager, TokenBucket, CLOSE_TRY_AGAIN_LATER, CLOSE_POLICY_VIOLATION
+
+
+class FakeWebSocket:
+    client = "test-client"
+
+    def __init__(self, blocked: bool = False) -> None:
+        self.sent = []
+        self.closed_with = None
+        self._unblocked = asyncio.Event()
+        if not blocked:
+            self._unblocked.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        await self._unblocked.wait()
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def wait_until(condition, timeout: float = 2.0) -> None:
+    """
+    Poll `condition` until it holds, failing the test after `timeout` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.001)
+
+
+@pytest_asyncio.fixture
+async def manager():
+    manager = ConnectionManager()
+    yield manager
+    await manager.shutdown()
+    assert not manager._close_tasks
+
+
+def test_token_bucket_allows_burst_then_limits():
+    """
+    Test that the bucket lets a burst through and then refuses until it refills.
+    """
+    bucket = TokenBucket(rate=0.001, burst=3)
+    assert [bucket.allow() for _ in range(4)] == [True, True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_evicted_without_blocking_others(manager):
+    """
+    Test that a client whose outbound queue fills up is evicted while healthy clients keep receiving.
+    """
+    healthy, stuck = FakeWebSocket(), FakeWebSocket(blocked=True)
+    await manager.connect(healthy)
+    await manager.connect(stuck)
+
+    for i in range(WS_SEND_QUEUE_SIZE + 2):
+        await manager.broadcast(f"event {i}")
+        await asyncio.sleep(0)
+    await wait_until(lambda: len(healthy.sent) == WS_SEND_QUEUE_SIZE + 3 and stuck.closed_with is not None)
+
+    assert stuck not in manager.connections
+    assert stuck.closed_with == CLOSE_TRY_AGAIN_LATER
+    assert healthy in manager.connections
+    assert healthy.sent[1:] == [f"event {i}" for i in range(WS_SEND_QUEUE_SIZE + 2)]  # after the hello
+    assert manager.snapshot()["evictions"]["slow_consumer"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flooding_client_is_rate_limited_then_evicted(manager):
+    """
+    Test that inbound messages beyond the burst are dropped and a persistent flood evicts the client.
+    """
+    chatty = FakeWebSocket()
+    await manager.connect(chatty)
+
+    accepted = [manager.accept_message(chatty) for _ in range(WS_INBOUND_BURST * 2 + 1)]
+    await wait_until(lambda: chatty.closed_with is not None)
+
+    assert accepted.count(True) == WS_INBOUND_BURST
+    assert chatty not in manager.connections
+    assert chatty.closed_with == CLOSE_POLICY_VIOLATION
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_only_missed_events(manager):
+    """
+    Test that a client resuming from its last seen sequence number receives only the events after it,
+    and that a client from another epoch is told to resync.
+    """
+    for i in range(5):
+        await manager.publish({"event": "lead_updated", "lead_id": str(i)})
+
+    resumed = FakeWebSocket()
+    await manager.connect(resumed, last_seq=3, epoch=manager.epoch)
+    stale = FakeWebSocket()
+    await manager.connect(stale, last_seq=3, epoch="previous-process")
+    await wait_until(lambda: len(resumed.sent) == 3 and len(stale.sent) == 2)
+
+    events = [json.loads(message) for message in resumed.sent]
+    assert events[0]["event"] == "hello" and events[0]["seq"] == 5
+    assert [event["seq"] for event in events[1:]] == [4, 5]
+    assert json.loads(stale.sent[-1])["event"] == "resync_required"
+
+
+@pytest.mark.asyncio
+async def test_shutdown_waits_for_pending_closes():
+    """
+    Test that the close of an evicted client is tracked until it finishes and that
+    shutdown waits for it.
+    """
+    manager = ConnectionManager()
+    closing = asyncio.Event()
+
+    class SlowClosingWebSocket(FakeWebSocket):
+        async def close(self, code=1000):
+            await closing.wait()
+            await super().close(code)
+
+    chatty = SlowClosingWebSocket()
+    await manager.connect(chatty)
+    for _ in range(WS_INBOUND_BURST * 2):
+        manager.accept_message(chatty)
+    assert len(manager._close_tasks) == 1
+
+    asyncio.get_running_loop().call_later(0.01, closing.set)
+    await manager.shutdown()
+    assert chatty.closed_with == CLOSE_POLICY_VIOLATION
+    assert not manager._close_tasks